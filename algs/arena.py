@@ -0,0 +1,118 @@
+from array import array
+import numpy as np
+
+NONE = -1
+LEAF, EXPANDED, TERMINAL, FREE = 0, 1, 2, 3
+
+class TreeArena:
+    """
+    Search tree of MCTS kept in preallocated typed arrays (struct of arrays), one slot per node.
+
+    A node is its slot index. It holds its visits, its summed reward, its parent, first child and next sibling, the move
+    that reaches it (row-major cell, -1 for the root), the piece of that move and its state: LEAF (children not generated),
+    EXPANDED, TERMINAL or FREE. Positions are not stored, the search rebuilds them by playing the moves from the root,
+    so the memory footprint is exactly slots * NODE_SIZE bytes.
+
+    The arrays are allocated once: slots are handed out from the top of the used part, then from the free slots, which
+    are chained through the sibling links. When an expansion does not fit, recycle() prunes the children of the least
+    visited expanded nodes; they become leaves again and keep their own visits and reward.
+
+    Attributes:
+        size: Memory budget in bytes.
+        slots: Number of nodes.
+        top: Number of slots ever handed out since the last clear().
+        available: Number of free slots.
+        recycled: Nodes freed by recycle() since the last clear().
+    """
+    NODE_SIZE = 28 # reward 8, visits 4, parent 4, child 4, sibling 4, move 2, piece 1, state 1
+
+    def __init__(self, size: int = 1 << 25) -> None:
+        self.size = size
+        self.slots = max(2, size // self.NODE_SIZE)
+        self.rewards = array("d", bytes(8 * self.slots))
+        self.visits = array("I", bytes(4 * self.slots))
+        self.parents = array("i", [NONE]) * self.slots
+        self.childs = array("i", [NONE]) * self.slots
+        self.siblings = array("i", [NONE]) * self.slots
+        self.moves = array("h", [NONE]) * self.slots
+        self.pieces = array("B", bytes(self.slots))
+        self.states = array("B", [FREE]) * self.slots
+        self.clear()
+
+    def clear(self) -> None:
+        '''Empties the tree; slots past top are never read, so the arrays are left as they are.'''
+        self.top, self.free, self.available, self.recycled = 0, NONE, self.slots, 0
+
+    def get_used(self) -> int: return self.slots - self.available
+
+    def allocate(self, parent: int, piece: int, move: int) -> int:
+        if self.free == NONE: node, self.top = self.top, self.top + 1
+        else: node, self.free = self.free, self.siblings[self.free]
+        self.available -= 1
+        self.rewards[node], self.visits[node] = 0, 0
+        self.parents[node], self.childs[node], self.siblings[node] = parent, NONE, NONE
+        self.moves[node], self.pieces[node], self.states[node] = move, piece, LEAF
+        return node
+
+    def release(self, node: int) -> None:
+        self.states[node], self.siblings[node] = FREE, self.free
+        self.free, self.available = node, self.available + 1
+
+    def new_root(self, piece: int) -> int:
+        self.clear()
+        return self.allocate(NONE, piece, NONE)
+
+    def reroot(self, node: int) -> None:
+        '''Keeps only the subtree of node, which becomes the root.'''
+        parent = self.parents[node]
+        if parent == NONE: return
+        if self.childs[parent] == node: self.childs[parent] = self.siblings[node]
+        else:
+            previous = next(child for child in self.children(parent) if self.siblings[child] == node)
+            self.siblings[previous] = self.siblings[node]
+        self.parents[node], self.siblings[node] = NONE, NONE
+        while self.parents[parent] != NONE: parent = self.parents[parent]
+        self.prune(parent)
+        self.release(parent)
+
+    def children(self, node: int):
+        child = self.childs[node]
+        while child != NONE:
+            yield child
+            child = self.siblings[child]
+
+    def expand(self, node: int, moves: list[tuple[int, int]]) -> bool:
+        '''Links one new leaf per (piece, move) under node; False if they do not fit even after recycling.'''
+        if len(moves) > self.available: self.recycle(len(moves), node)
+        if len(moves) > self.available: return False
+        last = NONE
+        for piece, move in reversed(moves):
+            child = self.allocate(node, piece, move)
+            self.siblings[child], last = last, child
+        self.childs[node], self.states[node] = last, EXPANDED
+        return True
+
+    def prune(self, node: int) -> None:
+        '''Frees every descendant of node, which becomes a leaf.'''
+        stack = list(self.children(node))
+        while stack:
+            child = stack.pop()
+            stack.extend(self.children(child))
+            self.release(child)
+        self.childs[node], self.states[node] = NONE, LEAF
+
+    def recycle(self, needed: int, keep: int) -> None:
+        '''Prunes the least visited expanded nodes until needed slots (and at least 1/8 of the arena) are free.
+        keep and its ancestors, up to the root, are never pruned.'''
+        protected, node = set(), keep
+        while node != NONE:
+            protected.add(node)
+            node = self.parents[node]
+
+        target, before = max(needed, self.slots // 8), self.available
+        expanded = np.flatnonzero(np.frombuffer(self.states, np.uint8, self.top) == EXPANDED)
+        visits = np.frombuffer(self.visits, np.uint32, self.top)[expanded]
+        for node in expanded[np.argsort(visits, kind = "stable")].tolist():
+            if self.available >= target: break
+            if node not in protected and self.states[node] == EXPANDED: self.prune(node)
+        self.recycled += self.available - before
@@ -0,0 +1,80 @@
+from struct import Struct
+import mmap, os
+
+BOOKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources", "books")
+HEADER = Struct("<4sHBBIBxxx") # magic, version, rows, columns, entries, plies
+ENTRY = Struct("<QhBx") # Zobrist key, move as a cell bit index, search depth
+MAGIC, VERSION = b"SL4B", 2
+
+class OpeningBook:
+    """
+    Opening book of one board size: the best move of every position of the first plies, searched offline (see book.py).
+
+    The file is a header followed by fixed-size entries sorted by the Zobrist key of their position (Board.get_key). Symmetric
+    positions have entries of their own: the moves are searched with an asymmetric evaluation, so the move of one orientation
+    is not replayed in the others. The file is memory-mapped read only and probed by binary search: nothing is loaded, and the
+    processes sharing a book share its pages.
+
+    Attributes:
+        rows, columns: Board size of the book.
+        plies: Number of plies from the empty board the book covers.
+        count: Number of entries (0 if there is no book file).
+        hits, misses: Counters of probe().
+    """
+    def __init__(self, path: str, rows: int, columns: int) -> None:
+        self.rows, self.columns, self.plies, self.count, self.data = rows, columns, 0, 0, None
+        self.hits = self.misses = 0
+        if not os.path.exists(path): return
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < HEADER.size: return
+            self.data = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, rows, columns, self.count, self.plies = HEADER.unpack_from(self.data)
+        if (magic, version, rows, columns) != (MAGIC, VERSION, self.rows, self.columns) or len(self.data) != HEADER.size + self.count * ENTRY.size:
+            raise ValueError(f"{path} is not a version {VERSION} opening book of a {self.rows}x{self.columns} board")
+
+    def __len__(self) -> int: return self.count
+    def get_plies(self) -> int: return self.plies
+
+    def find(self, key: int) -> tuple[int, int] | None:
+        '''(move bit index, depth) stored for the key, or None.'''
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if ENTRY.unpack_from(self.data, HEADER.size + middle * ENTRY.size)[0] < key: low = middle + 1
+            else: high = middle
+        if low == self.count: return None
+        entry, move, depth = ENTRY.unpack_from(self.data, HEADER.size + low * ENTRY.size)
+        return (move, depth) if entry == key else None
+
+    def probe(self, board, piece: str) -> tuple[int, int] | None:
+        '''Book move of piece on board (piece is to move), or None if the position is not in the book.'''
+        if self.count == 0 or board.get_rows() * board.get_columns() - board.get_empty_count() >= self.plies: return None
+        found = self.find(board.get_key("2" if piece == "1" else "1"))
+        move = None if found is None else board.bits.tables.coords[found[0]]
+        if move is None or not board.is_legal(move):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return move
+
+    def close(self) -> None:
+        if self.data is not None: self.data.close()
+        self.data, self.count = None, 0
+
+def get_path(rows: int, columns: int, directory: str = BOOKS) -> str: return os.path.join(directory, f"book{rows}x{columns}.bin")
+
+def write_book(path: str, rows: int, columns: int, plies: int, entries: dict) -> None:
+    '''Writes entries[Zobrist key] = (move bit index, depth) as a book file, through a temporary file
+    renamed into place, so processes reading the old book are not disturbed.'''
+    os.makedirs(os.path.dirname(path) or ".", exist_ok = True)
+    with open(path + ".tmp", "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, rows, columns, len(entries), plies))
+        for key in sorted(entries): file.write(ENTRY.pack(key, *entries[key]))
+    os.replace(path + ".tmp", path)
+
+BOOKS_OPEN = dict()
+
+def get_book(rows: int, columns: int) -> OpeningBook:
+    '''Book of the board size from the books directory, opened once per process (empty if there is no file).'''
+    if (rows, columns) not in BOOKS_OPEN: BOOKS_OPEN[(rows, columns)] = OpeningBook(get_path(rows, columns), rows, columns)
+    return BOOKS_OPEN[(rows, columns)]
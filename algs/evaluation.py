@@ -0,0 +1,215 @@
+import numpy as np
+from math import sqrt
+from game.bitboard import get_tables, INDEX
+
+DIRECTIONS = ((-1,-1),(-1,0),(0,1),(1,1),(1,0),(0,-1),(1,-1),(-1,1))
+OWNER = {"1": 1, "2": 2}
+
+def ray_value(owner: int, code: int) -> int:
+    ray = (code // 9, code // 3 % 3, code % 3)
+    if any(cell not in (0, owner) for cell in ray): return 0
+    run = 1 + ray.count(owner)
+    return run * (run + 1) // 2
+
+class Evaluator:
+    """
+    Vectorized form of the heuristic1/heuristic2 evaluation of an n x m board.
+
+    The board is read straight from the BitBoard masks into a vector of cells (0 empty, 1 or 2), in row-major order,
+    with one extra always empty sentinel cell at the end. Every per-piece term is then computed for all pieces at once:
+        neighbourhood: for each of the 8 rays of length 4 starting on the piece, 0 if an opposing piece is on the ray,
+                       otherwise 1 + 2 + ... + s where s counts the piece and its own pieces on the ray;
+        center_prox: center_weight * radius - distance to the center;
+        player_prox: player_prox_weight / (1 + closest proximity to a piece not of the side to move).
+    The per-piece terms are accumulated in row-major order, so the result is the same float as the scalar functions'.
+
+    Attributes:
+        bits: Bit index of every cell in the BitBoard masks, row-major.
+        rays: rays[c][d] holds the 3 cells after cell c along direction d (the sentinel where the ray leaves the board).
+        ray_values: ray_values[owner][code] is the neighbourhood value of a ray of a piece of owner, the ray's cells
+                    being read as the base 3 digits of code (ray_table holds the same values as lists).
+        own_rays, sources: (slot, [source,] 3 ray cells) of the 8 rays of a cell, and of every other ray going through it;
+                           slot is 8 * cell + direction.
+        radius: Distance from the corner to the center of the board.
+        center: Distance of every cell to the center.
+        prox: prox[c][o] is the proximity term of cell c to cell o.
+        closeness: closeness[o][c] is 1 / (1 + prox[c][o]).
+    """
+    def __init__(self, n: int, m: int) -> None:
+        self.n, self.m = n, m
+        tables = get_tables(n, m)
+        self.nbytes = (n * tables.stride + 7) // 8
+        coords = [(i, j) for i in range(n) for j in range(m)]
+
+        self.bits = np.array([tables.index[i][j] for i, j in coords])
+        self.rays = np.array([[[(i + k*di) * m + j + k*dj if -1 < i + k*di < n and -1 < j + k*dj < m else n * m for k in range(1, 4)]
+                               for di, dj in DIRECTIONS] for i, j in coords])
+        self.ray_table = [[ray_value(owner, code) for code in range(27)] for owner in range(3)]
+        self.ray_values = np.array(self.ray_table)
+        self.own_rays = [[(8 * c + d, *self.rays[c][d].tolist()) for d in range(len(DIRECTIONS))] for c in range(n * m)]
+        self.sources = [[] for _ in coords]
+        for c in range(n * m):
+            for slot, *cells in self.own_rays[c]:
+                for x in set(cells) - {n * m}: self.sources[x].append((slot, c, *cells))
+        self.digits = np.array([9, 3, 1])
+        self.radius = sqrt((n/2)**2 + (m/2)**2)
+        self.center = np.array([sqrt((n/2 - i)**2 + (m/2 - j)**2) for i, j in coords])
+        self.prox = np.array([[abs(sqrt(i**2 + j**2) - sqrt((i - u)**2 + (j - v)**2)) for u, v in coords] for i, j in coords])
+        self.center_list = self.center.tolist()
+        self.closeness = (1 / (1 + self.prox)).T.copy()
+
+    def cells(self, bits) -> np.ndarray:
+        raw = b"".join(mask.to_bytes(self.nbytes, "little") for mask in bits.masks)
+        ones, twos = np.unpackbits(np.frombuffer(raw, np.uint8), bitorder = "little").reshape(2, -1)[:, self.bits]
+        cells = np.zeros(self.n * self.m + 1, np.int64)
+        cells[:-1] = ones + 2 * twos
+        return cells
+
+    def neighbourhood(self, cells: np.ndarray, owners, rays: np.ndarray) -> np.ndarray:
+        '''Values of the given rays for pieces of owners (0 where the owner is empty).'''
+        return self.ray_values[owners, cells[rays] @ self.digits]
+
+    def score(self, bits, piece: str, opponent: str, neighbourhood_weight: float, center_weight: float, player_prox_weight: float) -> float:
+        '''Sum over the pieces of the board of (-1 for opponent pieces, 1 otherwise) * (neighbourhood + center_prox + player_prox).'''
+        cells = self.cells(bits)
+        occupied = np.flatnonzero(cells)
+        if not occupied.size: return 0
+        owners = cells[occupied]
+
+        neighbourhood = neighbourhood_weight * self.neighbourhood(cells, owners[:, None], self.rays[occupied]).sum(axis = 1)
+
+        center = center_weight * self.radius - self.center[occupied]
+        others = np.flatnonzero((cells != 0) & (cells != OWNER.get(piece, 0)))
+        prox = player_prox_weight / (1 + self.prox[occupied][:, others].min(axis = 1)) if others.size else 0
+
+        signs = np.where(owners == OWNER.get(opponent, 0), -1, 1)
+        return float((signs * (neighbourhood + center + prox)).cumsum()[-1])
+
+    def batch_score(self, cells: np.ndarray, piece: str, opponent: str, neighbourhood_weight: float, center_weight: float, player_prox_weight: float) -> np.ndarray:
+        '''score() of a stack of boards, one cells() vector per row. Empty cells add 0, so every row is the same float as score().'''
+        owners = cells[:, :-1]
+        occupied = owners != 0
+
+        neighbourhood = neighbourhood_weight * self.ray_values[owners[:, :, None], cells[:, self.rays] @ self.digits].sum(axis = 2)
+
+        center = center_weight * self.radius - self.center
+        others = occupied & (owners != OWNER.get(piece, 0))
+        prox = player_prox_weight / (1 + np.where(others[:, None, :], self.prox, np.inf).min(axis = 2))
+
+        signs = np.where(owners == OWNER.get(opponent, 0), -1, 1)
+        return np.where(occupied, signs * (neighbourhood + center + prox), 0).cumsum(axis = 1)[:, -1]
+
+EVALUATORS = dict()
+
+def get_evaluator(n: int, m: int) -> Evaluator:
+    if (n, m) not in EVALUATORS: EVALUATORS[(n, m)] = Evaluator(n, m)
+    return EVALUATORS[(n, m)]
+
+class Accumulator:
+    """
+    Evaluation terms of a position kept up to date as pieces are placed and removed, attached to a Board as board.accumulator.
+
+    Per piece type it holds the sum of its ray values (the neighbourhood before its weight), its number of pieces, the sum
+    of their distances to the center and, against either set of opposing pieces, the sum of 1 / (1 + closest proximity).
+    score() combines them with the weights in O(1).
+
+    Placing a piece recomputes only the rays going through its cell and its own 8 rays, logging the values it overwrites;
+    the closest proximities to the pieces of its type are updated with one vectorized maximum of 1 / (1 + proximity).
+    Undoing the last placement restores the log. Removing any other piece falls back to recompute(), the from-scratch
+    path the incremental state can be checked against.
+
+    Scores equal Evaluator.score up to float rounding, since the terms are added in a different order.
+    """
+    def __init__(self, bits) -> None:
+        self.evaluator = get_evaluator(bits.tables.n, bits.tables.m)
+        self.recompute(bits)
+
+    def copy(self):
+        accumulator = Accumulator.__new__(Accumulator)
+        accumulator.__dict__.update(self.__dict__)
+        accumulator.cells, accumulator.values, accumulator.stack = self.cells[:], self.values[:], self.stack[:]
+        return accumulator
+
+    def recompute(self, bits) -> None:
+        evaluator, self.stack = self.evaluator, []
+        cells = evaluator.cells(bits)
+        owners = cells[:-1]
+        values = evaluator.neighbourhood(cells, owners[:, None], evaluator.rays)
+        self.cells, self.values = cells.tolist(), values.ravel().tolist()
+        self.own = np.array([owners == 1, owners == 2], dtype = float)
+        self.closeness = np.array([evaluator.closeness[owners == owner].max(axis = 0, initial = 0) for owner in (1, 2)])
+        self.ray_sums = (self.own @ values.sum(axis = 1)).tolist()
+        self.counts = self.own.sum(axis = 1).tolist()
+        self.centers = (self.own @ evaluator.center).tolist()
+        self.proximity = (self.own @ self.closeness.T).tolist()
+
+    def place(self, piece: str, i: int, j: int) -> None:
+        evaluator, cells, values = self.evaluator, self.cells, self.values
+        index = INDEX[piece]
+        cell, table = i * evaluator.m + j, evaluator.ray_table
+        log, ray_sums = [], self.ray_sums[:]
+        cells[cell] = index + 1
+        for slot, source, a, b, c in evaluator.sources[cell]:
+            owner = cells[source]
+            if owner:
+                value = table[owner][9 * cells[a] + 3 * cells[b] + cells[c]]
+                log.append((slot, values[slot]))
+                ray_sums[owner - 1] += value - values[slot]
+                values[slot] = value
+        for slot, a, b, c in evaluator.own_rays[cell]:
+            value = table[index + 1][9 * cells[a] + 3 * cells[b] + cells[c]]
+            log.append((slot, values[slot]))
+            ray_sums[index] += value
+            values[slot] = value
+
+        self.stack.append((cell, log, self.ray_sums, self.counts, self.centers, self.own, self.closeness, self.proximity))
+        self.ray_sums = ray_sums
+        self.counts, self.centers = self.counts[:], self.centers[:]
+        self.counts[index] += 1
+        self.centers[index] += evaluator.center_list[cell]
+        self.own = self.own.copy()
+        self.own[index, cell] = 1
+        self.closeness = self.closeness.copy()
+        self.closeness[index] = np.maximum(self.closeness[index], evaluator.closeness[cell])
+        self.proximity = (self.own @ self.closeness.T).tolist()
+
+    def remove(self, i: int, j: int, bits) -> None:
+        '''Undoes the placement on (i, j); bits is the position after the removal.'''
+        cell = i * self.evaluator.m + j
+        if not self.stack or self.stack[-1][0] != cell: return self.recompute(bits)
+        _, log, self.ray_sums, self.counts, self.centers, self.own, self.closeness, self.proximity = self.stack.pop()
+        for slot, value in reversed(log): self.values[slot] = value
+        self.cells[cell] = 0
+
+    def score(self, piece: str, opponent: str, neighbourhood_weight: float, center_weight: float, player_prox_weight: float) -> float:
+        '''Evaluator.score of the current position (with no side to move, e.g. piece None, every piece counts as an other piece).'''
+        radius, score = self.evaluator.radius, 0
+        if piece in INDEX: proximity = [row[1 - INDEX[piece]] for row in self.proximity]
+        else: proximity = (self.own @ self.closeness.max(axis = 0)).tolist()
+        for index in (0, 1):
+            term = neighbourhood_weight * self.ray_sums[index] + center_weight * radius * self.counts[index] - self.centers[index]
+            term += player_prox_weight * proximity[index]
+            score += -term if OWNER.get(opponent) == index + 1 else term
+        return score
+
+def get_accumulator(state) -> Accumulator:
+    if state.accumulator is None: state.accumulator = Accumulator(state.bits)
+    return state.accumulator
+
+def evaluate1(state, piece: str, opponent: str, weight: float = 0.5, player1_weight: float = 1.05, player1_offset: float = .1, neighbourhood_weight: float = 5, center_weight: float = .5, player_prox_weight: float = 1) -> float:
+    '''heuristic1 of a Board, read from its accumulator.'''
+    heuristic_eval = get_accumulator(state).score(piece, opponent, neighbourhood_weight, center_weight, player_prox_weight)
+    if piece == "1": return round(player1_weight * weight * heuristic_eval + player1_offset, 3)
+    return round(weight * heuristic_eval / 10, 3)
+
+def batch_evaluate1(evaluator: Evaluator, cells: np.ndarray, piece: str, opponent: str, weight: float = 0.5, player1_weight: float = 1.05, player1_offset: float = .1, neighbourhood_weight: float = 5, center_weight: float = .5, player_prox_weight: float = 1) -> np.ndarray:
+    '''heuristic1 of a stack of boards (rows of Evaluator.cells vectors).'''
+    heuristic_eval = evaluator.batch_score(cells, piece, opponent, neighbourhood_weight, center_weight, player_prox_weight)
+    if piece == "1": return np.round(player1_weight * weight * heuristic_eval + player1_offset, 3)
+    return np.round(weight * heuristic_eval / 10, 3)
+
+def evaluate2(state, piece: str, opponent: str, weight: float = .5, player1_weight: float = 1.05, player1_offset: float = .1, neighbourhood_weight: float = 2, center_weight: float = 0.5, player_prox_weight: float = 1) -> float:
+    '''heuristic2 of a Board, read from its accumulator.'''
+    heuristic_eval = get_accumulator(state).score(piece, opponent, neighbourhood_weight, center_weight, player_prox_weight)
+    if piece == "1": return round(abs(player1_weight * weight * heuristic_eval)/10, 3)
+    return round(abs(weight * heuristic_eval)/10, 3)
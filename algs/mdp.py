@@ -1,3 +1,6 @@
+from game.objects import Node
+from algs.telemetry import Timed
+
 class MDP:
     """
     Markov Decision Process (MDP) is a mathematical framework for modeling decision-making
@@ -15,23 +18,96 @@ class MDP:
         state_analysis (function): A function that analyzes the state and returns whether it's terminal or not.
         execute (function): A function that executes an action in the environment and returns the resulting state.
         qfunction (function): A function representing the Q-function used for policy evaluation.
+        make (function): Applies an action to a state in place (used by the depth-first searches).
+        unmake (function): Undoes an action previously applied to a state with make.
+        rollout (function): Plays a batch of random continuations of a node and returns (mean qfunction, number of playouts).
     
     Functions:
         _get_actions (function): A function that returns the possible actions for a given state.
         state_analysis (function): A function that analyzes the state and returns whether it's terminal or not.
         execute (function): A function that executes an action in the environment and returns the resulting state.
         qfunction (function): A function representing the Q-function used for policy evaluation.
+        make, unmake (function): In place transition and its inverse.
+        rollout (function): Batched replacement of the simulation of MCTS, if any.
         action_type (None or str): Type of action, if any.
+        instrument (function): Times the functions above into the Telemetry of a search, or stops timing them.
     """
-    def __init__(self, get_actions, state_analysis, execute, qfunction):
+    def __init__(self, get_actions, state_analysis, execute, qfunction, make = None, unmake = None, rollout = None):
         self.get_actions = get_actions
         self.state_analysis = state_analysis
         self.execute = execute
         self._qfunction = qfunction
+        self.make, self.unmake = make, unmake
+        self._rollout = rollout
         self.action_type = None
         self.action_type_opponent = None
+        self.untimed = dict()
+
+    TIMED = {"get_actions": "movegen", "state_analysis": "terminal", "_qfunction": "evaluation", "_rollout": "rollout"}
+
+    def instrument(self, record) -> None:
+        '''Times move generation, terminal tests, evaluations and rollouts into record (a Telemetry); instrument(None) puts the
+        untimed functions back, so an MDP that is not instrumented pays nothing.'''
+        self.__dict__.update(self.untimed)
+        self.untimed = dict()
+        if record is None: return
+        for name, category in self.TIMED.items():
+            function = getattr(self, name)
+            if function is None: continue
+            self.untimed[name] = function
+            setattr(self, name, Timed(function, record.get_timer(category)))
+    def __getstate__(self):
+        '''Copies sent to other processes (MCTS workers) are never timed.'''
+        state = self.__dict__.copy()
+        state.update(self.untimed)
+        state["untimed"] = dict()
+        return state
 
     def qfunction(self, node): return self._qfunction(node, self.action_type_opponent, self.action_type)
+    def can_rollout(self) -> bool: return self._rollout is not None
+    def rollout(self, node, depth: int) -> tuple[float, int]: return self._rollout(node, depth, self.action_type_opponent, self.action_type)
     def non_terminal(self, node):
         """Checks if the given state is non-terminal."""
-        return not self.state_analysis(node)
\ No newline at end of file
+        return not self.state_analysis(node)
+
+class SharedPosition:
+    """
+    A single mutable copy of the root state that a depth-first search walks with make/unmake, plus one
+    reusable Node per ply. Only the children of the root are real nodes, kept so the caller can read their
+    rewards; deeper plies reuse the same Node, so memory stays flat as the depth grows.
+
+    Keys are the plain Zobrist keys of the position and the side that moved, not the canonical ones, and symmetric root
+    moves are all searched: the evaluations are not symmetric (their center and proximity terms are measured from one
+    corner), so symmetric positions may score differently.
+
+    Methods:
+        children(node, ply, actions): Returns the children of a node (in the order of actions, if given), to be walked with make/unmake.
+        make(node), unmake(node): Applies/undoes the action of a child on the shared state.
+        get_key(node) -> int: Zobrist key of the shared state as reached by node.
+        encode(move), decode(index): Converts a move of the shared state to/from its cell bit index, as stored in a transposition table.
+    """
+    def __init__(self, root: Node, depth: int, mdp: MDP) -> None:
+        self.mdp = mdp
+        self.state = root.get_state().copy()
+        self.plies = [root]
+        for _ in range(depth): self.plies.append(Node(self.state, self.plies[-1]))
+
+    def get_state(self): return self.state
+
+    def children(self, node: Node, ply: int, actions: list = None):
+        if actions is None: actions = self.mdp.get_actions(node)
+        if ply > 0: return self.reuse(self.plies[ply + 1], actions)
+        node.set_children([Node(self.state, node, action) for action in actions])
+        return node.get_children()
+
+    def make(self, node: Node) -> None: self.mdp.make(self.state, node.get_action())
+    def unmake(self, node: Node) -> None: self.mdp.unmake(self.state, node.get_action())
+
+    def get_key(self, node: Node) -> int: return self.state.get_key(node.get_action()[0])
+    def encode(self, move: tuple[int, int]) -> int: return self.state.bits.tables.index[move[0]][move[1]]
+    def decode(self, index: int) -> tuple[int, int]: return self.state.bits.tables.coords[index]
+
+    def reuse(self, node: Node, actions):
+        for action in actions:
+            node.reuse(action)
+            yield node
@@ -1,17 +1,28 @@
 from game.objects import Node, Board
-from copy import deepcopy
 from math import sqrt, log, pow, e
+from algs.evaluation import evaluate1, evaluate2, batch_evaluate1, OWNER
+from algs.rollouts import get_rollouts, DRAW
+from random import getrandbits
+import numpy as np
+
+def check_win(board: Board, move: tuple[int, int], turn) -> bool:
+    '''Checks the four lines through the last placed piece.'''
+    return move is not None and board.wins_at(str(turn), move)
+def check_draw(board: Board) -> bool: return board.is_full()
+def legal_moves(board: Board) -> list[tuple[int, int]]: return board.get_legal_moves()
 
 def game_state(node: Node, checkWin, checkDraw) -> int:
-    if node.is_root(): return False
-    directions = [(-1,-1),(-1,0),(0,1),(1,1),(1,0),(0,-1),(1,-1),(-1,1)]
-    for vector in directions:
-        if checkWin(node.get_state().get_matrix(), vector, node.get_action()[0]): return 1
-        if checkDraw(node.get_state().get_matrix()): return 2
+    '''Only the piece that was just placed can have completed a line, so only the lines through it are checked.'''
+    if node.is_root(): return 0
+    piece, move = node.get_action()
+    if checkWin(node.get_state(), move, piece): return 1
+    if checkDraw(node.get_state()): return 2
     return 0
 
 def state_analysis(node: Node, checkWin, checkDraw) -> bool:
-    node.set_terminal(game_state(node, checkWin, checkDraw) != 0)
+    if node.get_outcome() is None:
+        node.set_outcome(game_state(node, checkWin, checkDraw))
+        node.set_terminal(node.get_outcome() != 0)
     return node.is_terminal()
 
 def get_actions(node: Node, get_legal_moves) -> list[tuple[str, tuple[int, int]]]:
@@ -21,24 +32,42 @@ def get_actions(node: Node, get_legal_moves) -> list[tuple[str, tuple[int, int]]
     return actions
 
 def execute(node: Node, action) -> Node:
-    new_state = deepcopy(node.get_state())
+    new_state = node.get_state().copy()
     Board.place(new_state, action[0], action[1])
     return Node(new_state, node, action)
 
-def qfunction(node: Node, opponent: str, player: str, checkWin, checkDraw) -> float:
+def make(state: Board, action) -> None: state.place_piece(action[0], action[1])
+def unmake(state: Board, action) -> None: state.remove_piece(action[1])
+
+def qfunction(node: Node, opponent: str, player: str) -> float:
     if node.is_terminal():
-        if game_state(node, checkWin, checkDraw) == 2: return 0.5
+        if node.get_outcome() == 2: return 0.5
         return 0 if node.get_action()[0] == opponent else 1
     return softmax(qfunction3(node, opponent, player))
 
+def rollout(node: Node, depth: int, opponent: str, player: str, size: int = 256) -> tuple[float, int]:
+    '''Mean qfunction of size random continuations of node, each played as MCTS.simulate plays one; returns (mean, size).'''
+    state = node.get_state()
+    engine = get_rollouts(state.get_rows(), state.get_columns())
+    piece = "1" if node.get_action()[0] == "2" else "2"
+    winners, boards, to_move = engine.play(state.bits, piece, depth, size, np.random.default_rng(getrandbits(64)))
+
+    rewards = np.where(winners == OWNER[opponent], 0., 1.)
+    rewards[winners == DRAW] = .5
+    running = winners == 0
+    if running.any():
+        scores = batch_evaluate1(engine.evaluator, boards[running, :-1], to_move, opponent)
+        with np.errstate(over = "ignore"): rewards[running] = 1 / (1 + np.exp(-scores))
+    return float(rewards.mean()), size
+
 def softmax(x: float) -> float:
     if x == -float("inf"): return 0
     if x == float("inf"): return 1
     return 1/(1 + pow(e, -x))
 
 def qfunction1(node: Node) -> float: return heuristic(node.get_state().get_matrix(), "1" if node.get_action()[0] == "2" else "2")
-def qfunction3(node: Node, opponent: str, player: str) -> int: return heuristic1(node.get_state().get_matrix(), opponent if node.get_action()[0] == player else player, opponent)
-def qfunction4(node: Node, opponent: str, player: str) -> int: return heuristic2(node.get_state().get_matrix(), opponent if node.get_action()[0] == player else player, opponent)
+def qfunction3(node: Node, opponent: str, player: str) -> int: return evaluate1(node.get_state(), opponent if node.get_action()[0] == player else player, opponent)
+def qfunction4(node: Node, opponent: str, player: str) -> int: return evaluate2(node.get_state(), opponent if node.get_action()[0] == player else player, opponent)
 
 def heuristic(matrix, piece: str, n: int, m: int):
     score = 0
@@ -212,7 +241,7 @@ def visualize_montecarlo(nodes, uct_const: int, size: int) -> None:
             got_it = False
             for node in nodes:
                 if node.get_action()[1] == (i,j):
-                    eval = str(round(softmax(uct(node)), 3)) + f"/{round(node.get_reward()/node.get_visits(), 3)}/{node.get_visits()}" 
+                    eval = str(round(softmax(uct(node)), 3)) + f"/{round(node.get_reward()/max(node.get_visits(), 1), 3)}/{node.get_visits()}" 
                     c = len(eval)
                     if c < 15: eval = " "*(15 - c) + eval
                     cols.append(eval)
@@ -1,97 +1,250 @@
 from game.objects import Node
+from time import time
+from algs.mdp import SharedPosition
+from algs.transposition import TranspositionTable, EXACT, LOWER, UPPER
+from algs.ordering import MoveOrdering
+from algs.telemetry import PrintSink
 
 class AlphaBeta:
     """ Attributes:
         root_state: The initial state of the MDP.
         depth: The depth of the search tree.
         mdp: The Markov Decision Process (MDP) environment.
+        position: The shared position the search applies and undoes moves on.
+        table: Transposition table shared by every search of this object, table_size bytes large.
+        deadline: Time at which an iterative deepening search abandons the current iteration.
+        ordering: Move ordering policy (killer moves, history heuristic, static prior) used by min_value and max_value.
+        sink: Destination of the telemetry of the searches (PrintSink by default, NullSink turns it off).
+        record: Telemetry of the running search, None if it is not recorded.
 
     Methods:
         __init__(root, depth, mdp): Initializes the AlphaBeta object.
         reset(): Resets the AlphaBeta object.
         get_depth() -> int: Returns the depth of the search tree.
         create_root(state, action) -> Node: Creates the root node.
-        expand(node, iteration) -> None: Expands the children of a node at a certain depth.
+        expand(node, iteration, key) -> list[Node]: Returns the children of a node at a certain depth, best guess first.
+        order_actions(actions, iteration, key) -> list: Orders the actions with the previous iteration's scores or the ordering policy.
         min_value(node, alpha, beta, iteration) -> int: Calculates the minimum value for Alpha-Beta pruning.
         max_value(node, alpha, beta, iteration) -> int | None: Calculates the maximum value for Alpha-Beta pruning.
+        probe(node, key, alpha, beta, iteration) -> tuple: Looks the node up in the transposition table.
+        store(key, value, alpha, beta, iteration, best) -> None: Saves the result of a node in the transposition table.
         minimax(root_action, root) -> Node: Executes the Alpha-Beta search from the root node.
-        watch_stats(root) -> None: Prints statistics of the Alpha-Beta search. """
-    
-    def __init__(self, root, depth: int, mdp) -> None: 
+        iterative_minimax(root_action, delta_time) -> Node: Deepens the search until delta_time runs out.
+        ponder_minimax(root_action) -> None: Deepens a search of the opponent's move until stopped, filling the transposition table.
+        analyse_minimax(root_action, report) -> None: Deepens a search until stopped, reporting the root of every completed depth.
+        begin(record) -> None: Opens the telemetry of a search if record is set.
+        watch_stats(root) -> None: Completes the telemetry of the search and sends it to the sink. """
+
+    def __init__(self, root, depth: int, mdp, table_size: int = 1 << 22, ordering: MoveOrdering = None) -> None:
         self.root_state = root
         self.mdp = mdp
         self.depth = depth
         self.nodes_depth = 0
+        self.position = None
+        self.table = TranspositionTable(table_size)
+        self.ordering = ordering if ordering is not None else MoveOrdering()
+        self.root_order = dict()
+        self.deadline = None
+        self.timeout = False
+        self.completed_depth = 0
+        self.sink, self.record = PrintSink(), None
 
         self.stop = False
 
     def reset(self) -> None:
         self.nodes_depth = 0
         Node.reset()
+        self.table.set_owner((self.mdp.action_type, self.mdp._qfunction))
+        self.table.new_search()
+        self.table.reset_stats()
+        self.ordering.new_search()
+        self.ordering.reset_stats()
     def get_depth(self) -> int: return self.depth
+    def get_sink(self): return self.sink
+    def set_sink(self, sink) -> None: self.sink = sink
     def get_stop(self) -> bool: return self.stop
     def set_stop(self, stop: bool) -> None: self.stop = stop
+    def out_of_time(self) -> bool:
+        if self.deadline is not None and time() >= self.deadline: self.timeout = True
+        return self.timeout
 
     def create_root(self, state, action) -> Node:
         return Node(state, None, action)
 
-    def expand(self, node: Node, iteration: int) -> None:
-        node.set_children([self.mdp.execute(node,action) for action in self.mdp.get_actions(node)])
-        if iteration < self.get_depth() - 1:
-            for child in node.get_children():
-                value = float("inf") if iteration % 2 else -float("inf")
-                child.set_reward(value)
+    def order_actions(self, actions: list, iteration: int, key: int) -> list:
+        '''Principal variation first: the root follows the previous iteration's scores, other nodes try their stored best move first
+        and leave the rest to the ordering policy.'''
+        if iteration == 0 and self.root_order: return sorted(actions, key = lambda action: -self.root_order.get(action[1], -float("inf")))
+        index = self.table.get_move(key)
+        return self.ordering.order(actions, iteration, self.position.get_state(), None if index < 0 else self.position.decode(index))
+
+    def expand(self, node: Node, iteration: int, key: int):
+        actions = self.order_actions(self.mdp.get_actions(node), iteration, key)
+        if self.record is not None: self.record.expanded(iteration, len(actions))
+        children = self.position.children(node, iteration, actions)
+        if iteration == 0 and iteration < self.get_depth() - 1:
+            for child in children: child.set_reward(-float("inf"))
+        return children
+
+    def probe(self, node: Node, key: int, alpha: float, beta: float, iteration: int) -> tuple[float | None, float, float]:
+        '''Returns (value, alpha, beta): value is not None if the stored entry decides the node, otherwise the window is narrowed by its bound.'''
+        entry = self.table.probe(key)
+        if entry is None or entry[0] < self.get_depth() - iteration: return None, alpha, beta
+        _, value, flag, _ = entry
+        if flag == LOWER: alpha = max(alpha, value)
+        elif flag == UPPER: beta = min(beta, value)
+        if flag == EXACT or beta <= alpha:
+            self.table.cutoffs += 1
+            node.set_reward(value)
+            return value, alpha, beta
+        return None, alpha, beta
+
+    def store(self, key: int, value: float, alpha: float, beta: float, iteration: int, best: tuple = None) -> None:
+        '''best is the action, not the child: below the root the children are one reused Node, which holds the action of the
+        last child searched by the time the node is stored.'''
+        flag = UPPER if value <= alpha else LOWER if value >= beta else EXACT
+        self.table.store(key, self.get_depth() - iteration, value, flag, -1 if best is None else self.position.encode(best[1]))
+
+    def evaluate(self, node: Node, key: int) -> float:
+        node.increase_reward(self.mdp.qfunction(node))
+        self.nodes_depth += 1
+        self.table.store(key, 0, node.get_reward(), EXACT)
+        return node.get_reward()
 
     def min_value(self, node: Node, alpha: float, beta: float, iteration: int) -> int:
-        if self.get_stop(): return
+        if self.get_stop() or self.out_of_time(): return
 
         if not self.mdp.non_terminal(node):
             node.reward = float("inf")
             return node.get_reward()
-        if iteration == self.get_depth():
-            node.increase_reward(self.mdp.qfunction(node))
-            self.nodes_depth += 1
-            return node.get_reward()
+        key = self.position.get_key(node)
+        cached, alpha, beta = self.probe(node, key, alpha, beta, iteration)
+        if cached is not None: return cached
+        if iteration == self.get_depth(): return self.evaluate(node, key)
 
-        value = float("inf")
-        self.expand(node, iteration)
-        for child in node.get_children():
-            value = min(value, self.max_value(child, alpha, beta, iteration + 1))
+        value, best, window = float("inf"), None, (alpha, beta)
+        for index, child in enumerate(self.expand(node, iteration, key)):
+            self.position.make(child)
+            child_value = self.max_value(child, alpha, beta, iteration + 1)
+            self.position.unmake(child)
+            if child_value is None: return
+            if child_value < value: value, best = child_value, child.get_action()
             beta = min(beta, value)
-            if beta <= alpha: break
+            if beta <= alpha:
+                self.ordering.cutoff(child.get_action(), iteration, self.get_depth() - iteration, index)
+                break
 
         node.set_reward(value)
+        self.store(key, value, *window, iteration, best)
         return node.get_reward()
 
     def max_value(self, node: Node, alpha: float, beta: float, iteration: int = 0) -> int | None:
-        if self.get_stop(): return
+        if self.get_stop() or self.out_of_time(): return
         if not self.mdp.non_terminal(node):
             node.reward = -float("inf")
             self.nodes_depth += 1
             return node.get_reward()
-        if iteration == self.get_depth():
-            node.increase_reward(self.mdp.qfunction(node))
-            self.nodes_depth += 1
-            return node.get_reward()
+        key = self.position.get_key(node)
+        if not node.is_root():
+            cached, alpha, beta = self.probe(node, key, alpha, beta, iteration)
+            if cached is not None: return cached
+        if iteration == self.get_depth(): return self.evaluate(node, key)
 
-        value = -float("inf")
-        self.expand(node, iteration)
-        for child in node.get_children():
-            value = max(value, self.min_value(child, alpha, beta, iteration + 1))
+        value, best, window = -float("inf"), None, (alpha, beta)
+        for index, child in enumerate(self.expand(node, iteration, key)):
+            self.position.make(child)
+            child_value = self.min_value(child, alpha, beta, iteration + 1)
+            self.position.unmake(child)
+            if child_value is None: return
+            if child_value > value: value, best = child_value, child.get_action()
             alpha = max(alpha, value)
-            if beta <= alpha: break
+            if beta <= alpha:
+                self.ordering.cutoff(child.get_action(), iteration, self.get_depth() - iteration, index)
+                break
 
         node.set_reward(value)
+        self.store(key, value, *window, iteration, best)
         if node.is_root(): return
         return node.get_reward()
 
-    def minimax(self, root_action: str, root: Node = None, eval: bool = True) -> Node:
-        self.reset()
+    def search(self, root_action: str, root: Node = None) -> Node:
         if root == None: root = self.create_root(self.root_state, (root_action, None))
+        self.position = SharedPosition(root, self.get_depth(), self.mdp)
         self.max_value(root, -float("inf"), float("inf"))
+        return root
+
+    def minimax(self, root_action: str, root: Node = None, eval: bool = True) -> Node:
+        self.reset()
+        self.begin(eval)
+        self.root_order = dict()
+        root = self.search(root_action, root)
+        self.completed_depth = self.get_depth()
         if eval: self.watch_stats(root)
         return root
 
+    def iterative_minimax(self, root_action: str, delta_time: float, eval: bool = True) -> Node:
+        '''Searches depth 1, 2, 3... up to get_depth() and returns the root of the last iteration completed within delta_time seconds.
+        Depth 1 always completes; an iteration is not started if the previous one took longer than the time left.'''
+        self.reset()
+        self.begin(eval)
+        max_depth, start, best, nodes = self.get_depth(), time(), None, 0
+        self.root_order = dict()
+        for depth in range(1, max_depth + 1):
+            self.depth = depth
+            self.deadline = None if best is None else start + delta_time
+            begin = time()
+            root = self.search(root_action)
+            nodes += self.nodes_depth
+            if self.timeout or self.get_stop(): break
+
+            best, self.completed_depth = root, depth
+            self.root_order = {child.get_action()[1]: child.get_reward() for child in root.get_children()}
+            if abs(root.get_reward()) == float("inf") or depth >= root.get_state().get_empty_count(): break
+            if time() - begin > start + delta_time - time(): break
+
+        self.depth, self.deadline, self.timeout = max_depth, None, False
+        self.nodes_depth = nodes
+        if eval: self.watch_stats(best)
+        return best
+
+    def ponder_minimax(self, root_action: str) -> None:
+        '''Deepens a search of the root state, root_action being mdp.action_type (the opponent of the maximizing piece is to move),
+        until set_stop(True) or the depth limit. The scores it stores are valid for the next search after the opponent's move.'''
+        self.reset()
+        max_depth, self.deadline, self.root_order = self.get_depth(), None, dict()
+        for depth in range(1, max_depth + 1):
+            self.depth = depth
+            root = self.create_root(self.root_state, (root_action, None))
+            self.position = SharedPosition(root, depth, self.mdp)
+            value = self.min_value(root, -float("inf"), float("inf"), 0)
+            if self.get_stop() or abs(value) == float("inf") or depth >= root.get_state().get_empty_count(): break
+        self.depth = max_depth
+
+    def analyse_minimax(self, root_action: str, report) -> None:
+        '''Anytime search of the root state: deepens until set_stop(True) or the depth limit and calls report(depth, root) with the
+        root of every completed iteration. The transposition table is kept while mdp.action_type stays the same, so analysing
+        another position of the same side to move starts warm.'''
+        self.reset()
+        max_depth, self.deadline, self.root_order = self.get_depth(), None, dict()
+        for depth in range(1, max_depth + 1):
+            self.depth = depth
+            root = self.search(root_action)
+            if self.get_stop(): break
+            report(depth, root)
+            self.root_order = {child.get_action()[1]: child.get_reward() for child in root.get_children()}
+            if abs(root.get_reward()) == float("inf") or depth >= root.get_state().get_empty_count(): break
+        self.depth = max_depth
+
+    def begin(self, record: bool) -> None:
+        self.record = self.sink.open("AlphaBeta") if record else None
+        self.mdp.instrument(self.record)
+
     def watch_stats(self, root) -> None:
-        print(f"Total explored nodes: {self.nodes_depth}")
-        print(f"Total created nodes: {Node.next_node_id - 1}")
+        self.mdp.instrument(None)
+        if self.record is None: return
+        self.record.count(nodes = self.nodes_depth, created = Node.next_node_id - 1, evaluations = self.record.get_calls("evaluation"),
+                          cutoffs = self.ordering.cutoffs, first_move_cutoffs = self.ordering.get_first_cutoff_rate(),
+                          table_hits = self.table.hits, table_misses = self.table.misses, table_cutoffs = self.table.cutoffs,
+                          table_usage = self.table.usage(), depth = self.completed_depth)
+        self.sink.emit(self.record.finish())
+        self.record = None
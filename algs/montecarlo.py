@@ -1,67 +1,157 @@
 from game.objects import Node
 from time import time
-from random import choice
+from random import choice, seed, getrandbits
 from math import sqrt, log
+from multiprocessing import Pool, Event
+import signal
+from algs.arena import TreeArena, NONE, LEAF, EXPANDED, TERMINAL
+from game.bitboard import iter_bits
+from algs.telemetry import PrintSink
+
+WORKER = None
+
+def init_worker(mdp, event = None) -> None:
+    '''Runs once in every pool process: the searcher is kept for all the moves the pool is used for, and stops when the parent sets event.
+    Interrupts are left to the parent, and SIGTERM gets its default action back (pygame installs its own handler) so close() can stop the pool.'''
+    global WORKER
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    WORKER = MCTS(None, 0, 0, 0, 0, mdp)
+    WORKER.event = event
+
+def search_worker(task) -> tuple[list, int, float, tuple | None]:
+    '''Grows one independent tree from the root of task (or from the worker's last tree, if reuse is set);
+    returns (action, visits, reward) of its root children, its rollouts, its search time and what it reused.'''
+    state, root_action, action_type, action_type_opponent, delta_time, max_mem, simul_depth, uct_const, reuse, random_seed = task
+    seed(random_seed)
+    WORKER.reset()
+    WORKER.root_state, WORKER.delta_time, WORKER.max_mem, WORKER.simul_depth, WORKER.uct_const = state, delta_time, max_mem, simul_depth, uct_const
+    WORKER.reuse = reuse
+    WORKER.mdp.action_type, WORKER.mdp.action_type_opponent = action_type, action_type_opponent
+    root = WORKER.mcts(root_action, None, False)
+    if root is None: return [], WORKER.rollouts, time() - WORKER.get_start(), WORKER.reused
+    return [(child.get_action(), child.get_visits(), child.get_reward()) for child in root.get_children()], WORKER.rollouts, time() - WORKER.get_start(), WORKER.reused
 
 class MCTS:
 
     """
     Class for Monte Carlo Tree Search (MCTS) algorithm.
 
+    The tree lives in a TreeArena of max_mem bytes: nodes are slot indices, and the positions are rebuilt by playing the
+    moves of the selected path on one copy of the root state (undone after the backpropagation). The search returns a
+    Node of the root whose children carry the visits and rewards of the root moves.
+
     Attributes:
         root_state: The initial state of the MDP.
         delta_time: The time limit for search in seconds.
-        cp: The "computer power" limit.
+        max_mem: Memory budget of the tree in bytes; once it is full the least visited subtrees are recycled.
         mdp: The Markov Decision Process (MDP) environment.
+        workers: Number of processes of a root-parallel search (1 searches in this process). Every worker grows its own tree
+                 from the root for delta_time, then the visits and rewards of the root children are summed. The pool starts
+                 with the first parallel search and is reused until close().
+        rollouts: Number of simulated games of the last search.
+        reuse: Whether a search starts from the node of the last tree reached by the moves played since (its subtree is kept,
+               the rest is freed); the search starts from a fresh root if the position is not in that tree.
+        reused: (nodes, visits) of the subtree the last search started from, None if it started from a fresh root.
+        event: In a pool worker, the event the parent sets to stop the search (see run_workers).
+        arena: Tree of the last search.
+        root: Root of the last search in the arena.
+        state: The shared state the moves of the selected path are played on.
+        sink: Destination of the telemetry of the searches (PrintSink by default, NullSink turns it off).
+        record: Telemetry of the running search, None if it is not recorded.
 
     Methods:
-        __init__(root, delta_time, max_nodes, mdp): Initializes the MCTS object.
+        __init__(root, delta_time, max_mem, mdp): Initializes the MCTS object.
         reset(): Resets the MCTS object.
         get_start() -> int: Returns the start time of the search.
         get_delta_time() -> int: Returns the time limit for search.
         get_time() -> int: Returns the current time.
-        get_cp() -> int: Returns the "computer power" limit.
-        get_explored_children() -> dict[Node]: Returns the dictionary of explored children.
-        resources_left(time, comp_power) -> bool: Checks if resources are left for search.
+        get_max_mem() -> int: Returns the memory budget of the tree.
+        get_arena() -> TreeArena: Returns the tree, reallocated if the budget changed.
+        find_root(state, root_action) -> int: Finds the node of the last tree whose position is state.
+        descend(index, added) -> int: Follows the moves of a set of (piece, cell) down the tree.
+        resources_left(time) -> bool: Checks if resources are left for search.
         create_root_node(state, action) -> Node: Creates the root node.
         find_direct_children(node) -> list[Node]: Finds the direct children of a node.
         find_random_direct_child(node) -> Node: Finds a random direct child of a node.
-        uct_select(node, key) -> Node: Selects a child node using UCT algorithm.
-        select(starting_node) -> Node: Finds an unexplored descendent of a node.
-        expand(node) -> None: Expands the children of a node.
-        backpropagate(node, reward) -> None: Backpropagates the reward information in the tree.
-        simulate(starting_node) -> float: Simulates a certain universe from a starting branch (node) state.
+        uct(parent_visits, visits, reward) -> float: UCT value of a child.
+        uct_select(node) -> Node: Selects a child node using UCT algorithm.
+        get_action(index) -> tuple: Action of a node of the tree.
+        visit(index) -> Node: Reusable node of the shared state as reached by a node of the tree.
+        best_child(index) -> int: Selects a child of a node of the tree using UCT algorithm.
+        select(root) -> list[int]: Finds an unexplored descendent of a node and plays the moves leading to it.
+        expand(index, node, ply) -> bool: Expands the children of a node, False if the arena has no room for them.
+        backpropagate(index, reward) -> None: Backpropagates the reward information in the tree.
+        simulate(starting_node) -> float: Simulates a certain universe from a starting branch (node) state (a batch of them if the MDP has a rollout).
+        view(index, action) -> Node: Node of a node of the tree with a child Node per child.
         mcts(root) -> Node: Runs the MCTS algorithm.
-        watch_stats(root) -> None: Prints statistics of the MCTS search.
-        draw_graph(root) -> None: Draws the tree graph.
+        parallel_mcts(root) -> Node: Runs the MCTS algorithm in every worker and merges the root children.
+        run_workers(root_action, root, delta_time) -> list: Runs a search in every worker, stopping them on set_stop(True).
+        ponder_mcts(root_action) -> None: Grows the tree(s) of the root state until set_stop(True).
+        close() -> None: Stops the worker processes.
+        begin(record) -> None: Opens the telemetry of a search if record is set.
+        discard() -> None: Closes the telemetry of a stopped search without sending it.
+        watch_stats(root) -> None: Completes the telemetry of the search (tree size, playouts, timers, branching) and sends it to the sink.
+        watch_parallel_stats(results) -> None: Same for a parallel search, with the playouts of every worker.
     """
 
-    def __init__(self, root, delta_time: int, max_nodes: int, simul_depth: int, uct_const: int, mdp) -> None:
+    def __init__(self, root, delta_time: int, max_mem: int, simul_depth: int, uct_const: int, mdp, workers: int = 1, reuse: bool = False) -> None:
         self.root_state = root
-        self.delta_time, self.cp = delta_time, max_nodes
+        self.delta_time, self.max_mem = delta_time, max_mem
         self.simul_depth = simul_depth
         self.uct_const = uct_const
         self.mdp = mdp
+        self.workers = workers
+        self.pool, self.pool_event, self.event = None, None, None
+        self.reuse, self.reused = reuse, None
+        self.arena, self.root, self.owner = None, NONE, None
+        self.state, self.nodes = None, None
+        self.sink, self.record = PrintSink(), None
 
         self.stop = False
         self.reset()
 
     def reset(self):
-        self.explored_children = dict()
         self.start = 0
+        self.rollouts = 0
         Node.reset()
-    def get_stop(self) -> bool: return self.stop
+    def get_sink(self): return self.sink
+    def set_sink(self, sink) -> None: self.sink = sink
+    def get_stop(self) -> bool: return self.stop or (self.event is not None and self.event.is_set())
     def set_stop(self, stop: bool) -> None: self.stop = stop
 
     def get_start(self) -> int: return self.start
     def get_delta_time(self) -> int: return self.delta_time
     def get_time(self) -> int: return time()
-    def get_cp(self) -> int: return self.cp
+    def get_max_mem(self) -> int: return self.max_mem
+    def get_workers(self) -> int: return self.workers
     def get_simul_depth(self) -> int: return self.simul_depth
     def get_uct_const(self) -> int: return self.uct_const
-    def get_explored_children(self) -> dict[Node]: return self.explored_children
+    def get_arena(self) -> TreeArena:
+        if self.arena is None or self.arena.size != self.get_max_mem(): self.arena, self.root = TreeArena(self.get_max_mem()), NONE
+        return self.arena
 
-    def resources_left(self, time: int, comp_power: int): return time < self.get_start() + self.get_delta_time() and comp_power <= self.get_cp()
+    def find_root(self, state, root_action: str) -> int:
+        '''Node of the last tree reached by the pieces added to its root position to get state, NONE if there is none'''
+        previous = self.state
+        if self.root == NONE or self.owner != self.mdp.action_type or previous.bits.tables is not state.bits.tables: return NONE
+        added = set()
+        for piece, (before, after) in enumerate(zip(previous.bits.masks, state.bits.masks), 1):
+            if before & ~after: return NONE
+            added.update((piece, i * state.get_columns() + j) for i, j in (state.bits.tables.coords[bit] for bit in iter_bits(after & ~before)))
+        index = self.descend(self.root, added)
+        return index if index != NONE and self.arena.pieces[index] == int(root_action) else NONE
+
+    def descend(self, index: int, added: set) -> int:
+        if not added: return index
+        for child in self.arena.children(index):
+            move = (self.arena.pieces[child], self.arena.moves[child])
+            if move not in added: continue
+            found = self.descend(child, added - {move})
+            if found != NONE: return found
+        return NONE
+
+    def resources_left(self, time: int) -> bool: return time < self.get_start() + self.get_delta_time()
 
     def create_root_node(self, state, action) -> Node: return Node(state, None, action)
     def find_direct_children(self, node) -> list[Node]:
@@ -72,50 +162,69 @@ class MCTS:
         if not children: return
         return choice(children)
 
+    def uct(self, parent_visits: int, visits: int, reward: float) -> float:
+        if parent_visits == 0: raise ValueError("Parent node has 0 visits")
+        if visits == 0: return float("inf")
+        if self.get_uct_const() > 0:
+            if visits > 1: return reward/visits + self.get_uct_const() * sqrt(log(parent_visits)/log(visits))
+            else: return float("inf")
+        return reward/visits
+
     def uct_select(self, node: Node) -> Node:
         '''Select a child of node, balancing exploration & exploitation'''
-        def uct(node) -> float:
-            if node.get_parent().get_visits() == 0: raise ValueError("Parent node has 0 visits")
+        return max(node.get_children(), key = lambda child: self.uct(node.get_visits(), child.get_visits(), child.get_reward()))
 
-            n_parent = node.get_parent().get_visits()
-            n_i = node.get_visits()
+    def get_action(self, index: int):
+        move = self.arena.moves[index]
+        return "1" if self.arena.pieces[index] == 1 else "2", None if move < 0 else divmod(move, self.state.get_columns())
 
-            if n_i == 0: return float("inf")
-            v_i = node.get_reward()/n_i
+    def visit(self, index: int) -> Node:
+        node = self.nodes[self.arena.parents[index] != NONE]
+        node.reuse(self.get_action(index))
+        return node
 
-            if self.get_uct_const() > 0:
-                if n_i > 1: return v_i + self.get_uct_const() * sqrt(log(n_parent)/log(n_i))
-                else: return float("inf")
-            return v_i
+    def best_child(self, index: int) -> int:
+        arena = self.arena
+        return max(arena.children(index), key = lambda child: self.uct(arena.visits[index], arena.visits[child], arena.rewards[child]))
 
-        return max(node.get_children(), key=uct)
-
-    def select(self, starting_node: Node) -> Node:
-        '''Find an unexplored descendent of node'''
-        path = []
-        node = starting_node
-        while True:
+    def select(self, root: int) -> list[int]:
+        '''Find an unexplored descendent of node, playing the moves of the path on the shared state'''
+        arena, path, node = self.arena, [root], root
+        while arena.states[node] == EXPANDED:
+            unexplored = next((child for child in arena.children(node) if arena.states[child] == LEAF), NONE)
+            node = self.best_child(node) if unexplored == NONE else unexplored
+            self.mdp.make(self.state, self.get_action(node))
             path.append(node)
-            if node not in self.get_explored_children() or not self.get_explored_children()[node]: return path[-1]
-            unexplored = self.get_explored_children()[node] - self.get_explored_children().keys()
-            if unexplored: return unexplored.pop()
-            node = self.uct_select(node)
-
-    def expand(self, node: Node) -> None:
-        "Update the children dict with the children of node"
-        if node in self.get_explored_children(): return  # already expanded
-        if not node.get_children(): node.set_children(self.find_direct_children(node))
-        self.explored_children[node] = node.get_children()
-
-    def backpropagate(self, node: Node, reward: int) -> None:
+            if unexplored != NONE: break
+        return path
+
+    def expand(self, index: int, node: Node, ply: int = 0) -> bool:
+        "Add the children of node to the tree; if they do not fit even after recycling, node stays a leaf and False is returned"
+        actions = self.mdp.get_actions(node)
+        m = self.state.get_columns()
+        if not self.arena.expand(index, [(int(piece), i * m + j) for piece, (i, j) in actions]):
+            if self.record is not None: self.record.count(arena_full = self.record.counters.get("arena_full", 0) + 1)
+            return False
+        if self.record is not None:
+            self.record.expanded(ply, len(actions))
+            self.record.maximum("peak_tree", self.arena.get_used())
+        return True
+
+    def backpropagate(self, index: int, reward: float) -> None:
         '''Restructure the tree according to the new rewards'''
-        node.increase_visits()
-        node.increase_reward(reward)
-        if node.is_root(): return
-        self.backpropagate(node.get_parent(), reward)
+        arena = self.arena
+        while index != NONE:
+            arena.visits[index] += 1
+            arena.rewards[index] += reward
+            index = arena.parents[index]
 
     def simulate(self, starting_node: Node) -> float:
         '''Simulate a certain universe from a starting branch (node) state'''
+        if self.mdp.can_rollout():
+            reward, playouts = self.mdp.rollout(starting_node, self.get_simul_depth())
+            self.rollouts += playouts
+            return reward
+        self.rollouts += 1
         node = self.find_random_direct_child(starting_node)
         count = 0
         while self.mdp.non_terminal(node) and count < self.get_simul_depth():
@@ -125,20 +234,137 @@ class MCTS:
             count += 1
         return self.mdp.qfunction(node)
 
-    def mcts(self, root_action: str, root: Node = None) -> Node:
+    def view(self, index: int, action) -> Node:
+        '''Root node carrying the statistics of index, with one child per child of index (their states are not rebuilt)'''
+        arena = self.arena
+        root = self.create_root_node(self.root_state, action)
+        root.increase_visits(arena.visits[index])
+        root.increase_reward(arena.rewards[index])
+        children = []
+        for child in arena.children(index):
+            node = Node(None, root, self.get_action(child))
+            node.increase_visits(arena.visits[child])
+            node.increase_reward(arena.rewards[child])
+            children.append(node)
+        root.set_children(children)
+        return root
+
+    def mcts(self, root_action: str, root: Node = None, eval: bool = True) -> Node:
+        if root is not None: self.root_state, root_action = root.get_state(), root.get_action()[0]
+        arena = self.get_arena()
+        index = self.find_root(self.root_state, root_action) if self.reuse else NONE
+        if index == NONE: index, self.reused = arena.new_root(int(root_action)), None
+        else:
+            arena.reroot(index)
+            self.reused = (arena.get_used(), arena.visits[index])
+        self.root, self.owner = index, self.mdp.action_type
+        self.state = self.root_state.copy()
+        self.nodes = [Node(self.state, None, (root_action, None))]
+        self.nodes.append(Node(self.state, self.nodes[0]))
+
+        self.begin(eval)
+        self.start = time()
+        while self.resources_left(self.get_time()):
+            path = self.select(index)
+            leaf = path[-1]
+            node = self.visit(leaf)
+            if self.mdp.non_terminal(node):
+                self.expand(leaf, node, len(path) - 1) # a leaf the arena has no room for is simulated all the same
+                reward = self.simulate(node)
+            else:
+                arena.states[leaf] = TERMINAL
+                reward = self.mdp.qfunction(node)
+            self.backpropagate(leaf, reward)
+            for child in reversed(path[1:]): self.mdp.unmake(self.state, self.get_action(child))
+            if self.get_stop():
+                self.discard()
+                return
+
+        root = self.view(index, (root_action, None))
+        if eval: self.watch_stats(root)
+        return root
+
+    def get_pool(self):
+        if self.pool is None:
+            self.pool_event = Event()
+            self.pool = Pool(self.get_workers(), init_worker, (self.mdp, self.pool_event))
+        return self.pool
+
+    def close(self) -> None:
+        if self.pool is not None: self.pool.terminate()
+        self.pool = None
+
+    def run_workers(self, root_action: str, root: Node, delta_time: float) -> list | None:
+        '''Runs search_worker in every worker; on set_stop(True) the workers are stopped through the pool's event and None is returned'''
+        task = (root.get_state(), root_action, self.mdp.action_type, self.mdp.action_type_opponent, delta_time, self.get_max_mem(), self.get_simul_depth(), self.get_uct_const(), self.reuse)
+        pending = self.get_pool().map_async(search_worker, [task + (getrandbits(64),) for _ in range(self.get_workers())])
+        while not pending.ready():
+            pending.wait(0.005)
+            if self.get_stop():
+                self.pool_event.set()
+                pending.wait()
+                self.pool_event.clear()
+                return
+        return pending.get()
+
+    def parallel_mcts(self, root_action: str, root: Node = None, eval: bool = True) -> Node:
         if root == None: root = self.create_root_node(self.root_state, (root_action, None))
+        self.begin(eval)
         self.start = time()
-        while self.resources_left(self.get_time(), len(self.get_explored_children().keys())):
-            leaf = self.select(root)
-            if self.mdp.non_terminal(leaf):
-                self.expand(leaf)
-                reward = self.simulate(leaf)
-                self.backpropagate(leaf, reward)
-            if self.get_stop(): return
-
-        self.watch_stats(root)
+        results = self.run_workers(root_action, root, self.get_delta_time())
+        if results is None:
+            self.discard()
+            return
+
+        root.set_children(self.find_direct_children(root))
+        children = {child.get_action(): child for child in root.get_children()}
+        for stats, *_ in results:
+            for action, visits, reward in stats:
+                children[action].increase_visits(visits)
+                children[action].increase_reward(reward)
+                root.increase_visits(visits)
+                root.increase_reward(reward)
+        self.rollouts = sum(rollouts for _, rollouts, *_ in results)
+
+        if eval: self.watch_parallel_stats(results)
         return root
 
+    def ponder_mcts(self, root_action: str) -> None:
+        '''Searches the root state, root_action being the piece that just moved, until set_stop(True). With reuse set,
+        the next search from a position following it starts from the tree grown here (each worker's own tree in parallel).'''
+        if self.get_workers() > 1:
+            self.run_workers(root_action, self.create_root_node(self.root_state, (root_action, None)), float("inf"))
+            return
+        delta_time, self.delta_time = self.delta_time, float("inf")
+        try: self.mcts(root_action, None, False)
+        finally: self.delta_time = delta_time
+
+    def begin(self, record: bool) -> None:
+        self.record = self.sink.open("MCTS") if record else None
+        self.mdp.instrument(self.record)
+
+    def discard(self) -> None:
+        self.mdp.instrument(None)
+        self.record = None
+
     def watch_stats(self, root) -> None:
-        print(f"Total explored nodes: {len(self.get_explored_children().keys())}")
-        print(f"Total created nodes: {Node.next_node_id - 1}")
+        self.mdp.instrument(None)
+        if self.record is None: return
+        arena, elapsed = self.get_arena(), max(time() - self.get_start(), 1e-9)
+        reused_nodes, reused_visits = self.reused if self.reused is not None else (0, 0)
+        self.record.count(nodes = root.get_visits(), evaluations = self.record.get_calls("evaluation"), tree = arena.get_used(), tree_slots = arena.slots,
+                          recycled = arena.recycled, reused_nodes = reused_nodes, reused_visits = reused_visits,
+                          playouts = self.rollouts, playouts_per_second = self.rollouts / elapsed)
+        self.record.maximum("peak_tree", arena.get_used())
+        self.sink.emit(self.record.finish())
+        self.record = None
+
+    def watch_parallel_stats(self, results) -> None:
+        self.mdp.instrument(None)
+        if self.record is None: return
+        elapsed = max(time() - self.get_start(), 1e-9)
+        self.record.count(workers = len(results), playouts = self.rollouts, playouts_per_second = self.rollouts / elapsed,
+                          worker_playouts = [rollouts for _, rollouts, *_ in results],
+                          worker_reused_visits = [reused[1] if reused else 0 for *_, reused in results])
+        self.sink.emit(self.record.finish())
+        self.record = None
@@ -1,75 +1,110 @@
-from game.objects import Node
-
-class Negamax:
-    """
-    Class for implementing the Negamax algorithm.
-
-    Methods:
-        __init__(root, max_depth, mdp): Initializes the Negamax object.
-        create_root(state, action) -> Node: Creates the root node.
-        expand(node) -> None: Expands the children of a node.
-        grow_tree(node, iteration) -> None: Grows the tree from a node.
-        neg_or_max(node, children_eval) -> float: Calculates the negamax or max value for a node.
-        evaluate_tree(node) -> None: Evaluates the tree and updates the reward values.
-        negamax(root) -> Node: Runs the Negamax algorithm.
-    """
-    def __init__(self, root, root_sign: int, depth: int, mdp) -> None:
-        self.root_state = root
-        self.depth = depth
-        self.mdp = mdp
-        self.root_sign = root_sign
-        self.nodes_depth = 0
-
-        self.stop = False
-
-    def reset(self) -> None:
-        self.nodes_depth = 0
-        Node.reset()
-    def get_stop(self) -> bool: return self.stop
-    def set_stop(self, stop: bool) -> None: self.stop = stop
-    def create_root(self, state, action) -> Node: return Node(state, None, action)
-
-    def expand(self, node) -> None:
-        node.set_children([self.mdp.execute(node,action) for action in self.mdp.get_actions(node)])
-        if not node.get_children(): return
-
-    def grow_tree(self, node: Node, iteration: int = 0) -> None:
-        if self.get_stop(): return
-        if not self.mdp.non_terminal(node):
-            node.reward = float("inf")
-            self.nodes_depth += 1
-            return
-        if iteration == self.depth:
-            node.increase_reward(self.mdp.qfunction(node))
-            self.nodes_depth += 1
-            return
-        self.expand(node)
-        for child in node.get_children(): self.grow_tree(child, iteration + 1)
-
-    def neg_or_max(self, sign: int, children_eval: list[float]) -> float:
-        eval = -float("inf")
-        for child_eval in children_eval: eval = max(eval, sign * child_eval)
-        return eval
-
-    def evaluate_tree(self, node: Node, sign: int):
-        if self.get_stop(): return
-        if not node.get_children(): return node.get_reward()
-        children_eval = [self.evaluate_tree(child, -sign) for child in node.get_children()]
-        node.increase_reward(self.neg_or_max(sign, children_eval))
-        if not node.is_root(): return node.get_reward()
-        return
-
-    def negamax(self, root_action: str, root: Node = None) -> Node:
-        self.reset()
-        if root == None: root = self.create_root(self.root_state, (root_action, None))
-        self.grow_tree(root)
-        self.evaluate_tree(root, self.root_sign)
-        if self.get_stop():
-            self.set_stop(False)
-            return
-        self.watch_stats(root)
-        return root
-
-    def watch_stats(self, root) -> None:
-        print(f"Total explored nodes: {self.nodes_depth}")
-        print(f"Total created nodes: {Node.next_node_id - 1}")
+from game.objects import Node
+from algs.mdp import SharedPosition
+from algs.ordering import MoveOrdering
+from algs.telemetry import PrintSink
+
+class Negamax:
+    """
+    Class for implementing the Negamax algorithm with alpha-beta windows.
+
+    The search is a single depth-first pass over a shared position, so memory grows linearly with the depth.
+    Values are negamax values for the side to move; a color of 1 means "1" is to move, -1 means "2" is.
+    Leaf evaluations from the qfunction are scores for the root player (mdp.action_type, whose color is root_sign), so they
+    are multiplied by color * root_sign to be relative to the side to move at the leaf.
+
+    Rewards left on the nodes follow what Bot1 and visualize_negamax read: the root holds its negamax value and
+    every root child holds its score for "1" (root_sign * child reward is the child's score for the root player).
+
+    Methods:
+        __init__(root, root_sign, depth, mdp, ordering): Initializes the Negamax object.
+        create_root(state, action) -> Node: Creates the root node.
+        expand(node, iteration) -> list[Node]: Returns the children of a node, in the ordering policy's order.
+        evaluate(node, alpha, beta, color, iteration) -> float: Negamax value of a node within the (alpha, beta) window.
+        negamax(root) -> Node: Runs the Negamax algorithm.
+        discard() -> None: Closes the telemetry of a stopped search without sending it.
+        watch_stats(root) -> None: Completes the telemetry of the search (nodes, cutoffs, timers, branching) and sends it to the sink.
+    """
+    def __init__(self, root, root_sign: int, depth: int, mdp, ordering: MoveOrdering = None) -> None:
+        self.root_state = root
+        self.depth = depth
+        self.mdp = mdp
+        self.root_sign = root_sign
+        self.nodes_depth = 0
+        self.position = None
+        self.ordering = ordering if ordering is not None else MoveOrdering()
+        self.sink, self.record = PrintSink(), None
+
+        self.stop = False
+
+    def reset(self) -> None:
+        self.nodes_depth = 0
+        Node.reset()
+        self.ordering.new_search()
+        self.ordering.reset_stats()
+    def get_sink(self): return self.sink
+    def set_sink(self, sink) -> None: self.sink = sink
+    def get_stop(self) -> bool: return self.stop
+    def set_stop(self, stop: bool) -> None: self.stop = stop
+    def create_root(self, state, action) -> Node: return Node(state, None, action)
+
+    def expand(self, node: Node, iteration: int):
+        actions = self.ordering.order(self.mdp.get_actions(node), iteration, self.position.get_state())
+        if self.record is not None: self.record.expanded(iteration, len(actions))
+        children = self.position.children(node, iteration, actions)
+        if iteration == 0:
+            for child in children: child.set_reward(self.root_sign * -float("inf"))
+        return children
+
+    def evaluate(self, node: Node, alpha: float, beta: float, color: int, iteration: int = 0) -> float | None:
+        if self.get_stop(): return
+        if not self.mdp.non_terminal(node):
+            self.nodes_depth += 1
+            value = 0 if node.get_outcome() == 2 else -float("inf")
+            node.set_reward(color * value)
+            return value
+        if iteration == self.depth:
+            self.nodes_depth += 1
+            value = color * self.root_sign * self.mdp.qfunction(node)
+            node.set_reward(color * value)
+            return value
+
+        value = -float("inf")
+        for index, child in enumerate(self.expand(node, iteration)):
+            self.position.make(child)
+            child_value = self.evaluate(child, -beta, -alpha, -color, iteration + 1)
+            self.position.unmake(child)
+            if child_value is None: return
+            value = max(value, -child_value)
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                self.ordering.cutoff(child.get_action(), iteration, self.depth - iteration, index)
+                break
+
+        node.set_reward(value if node.is_root() else color * value)
+        return value
+
+    def negamax(self, root_action: str, root: Node = None) -> Node:
+        self.reset()
+        self.record = self.sink.open("Negamax")
+        self.mdp.instrument(self.record)
+        if root == None: root = self.create_root(self.root_state, (root_action, None))
+        self.position = SharedPosition(root, self.depth, self.mdp)
+        self.evaluate(root, -float("inf"), float("inf"), self.root_sign)
+        if self.get_stop():
+            self.set_stop(False)
+            self.discard()
+            return
+        self.watch_stats(root)
+        return root
+
+    def discard(self) -> None:
+        self.mdp.instrument(None)
+        self.record = None
+
+    def watch_stats(self, root) -> None:
+        self.mdp.instrument(None)
+        if self.record is None: return
+        self.record.count(nodes = self.nodes_depth, created = Node.next_node_id - 1, evaluations = self.record.get_calls("evaluation"),
+                          cutoffs = self.ordering.cutoffs, first_move_cutoffs = self.ordering.get_first_cutoff_rate(), depth = self.depth)
+        self.sink.emit(self.record.finish())
+        self.record = None
@@ -0,0 +1,69 @@
+class MoveOrdering:
+    """
+    Orders the actions of a node so that the move most likely to cause an alpha-beta cutoff is searched first.
+
+    Priority, from highest to lowest:
+        1. the best move stored for the position (transposition table / previous iteration);
+        2. a move that completes 4 in a row, then a move that blocks the opponent's 4 in a row;
+        3. the killer moves of the ply (the last moves that caused a cutoff at the same depth in a sibling);
+        4. the history score of the cell (sum of depth^2 of every cutoff it caused) plus a static prior that
+           prefers cells close to the center.
+
+    Subclass it and override score() to plug another policy into AlphaBeta.
+
+    Attributes:
+        killers: killers[ply] holds the killer moves of that ply, most recent first.
+        history: Cell -> history score.
+        cutoffs: Number of cutoffs reported since the last reset_stats().
+        first_cutoffs: Cutoffs caused by the first move searched.
+    """
+    BEST, WIN, BLOCK, KILLER = 1 << 40, 1 << 36, 1 << 34, 1 << 32
+
+    def __init__(self, killer_slots: int = 2, center_weight: float = 1) -> None:
+        self.killer_slots = killer_slots
+        self.center_weight = center_weight
+        self.killers = []
+        self.history = dict()
+        self.priors = dict()
+        self.reset_stats()
+
+    def reset_stats(self) -> None: self.cutoffs = self.first_cutoffs = 0
+    def get_first_cutoff_rate(self) -> float: return self.first_cutoffs / self.cutoffs if self.cutoffs else 0
+
+    def new_search(self) -> None:
+        '''Killers belong to the plies of one search; the history is halved so older searches fade out.'''
+        self.killers = []
+        for move in self.history: self.history[move] //= 2
+
+    def get_killers(self, ply: int) -> list:
+        while len(self.killers) <= ply: self.killers.append([None] * self.killer_slots)
+        return self.killers[ply]
+
+    def prior(self, state, move: tuple[int, int]) -> float:
+        n, m = state.get_rows(), state.get_columns()
+        if (n, m) not in self.priors:
+            self.priors[(n, m)] = {(i, j): -self.center_weight * ((i - (n - 1)/2)**2 + (j - (m - 1)/2)**2) for i in range(n) for j in range(m)}
+        return self.priors[(n, m)][move]
+
+    def score(self, action, ply: int, state, best_move) -> float:
+        piece, move = action
+        if move == best_move: return self.BEST
+        score = self.history.get(move, 0) + self.prior(state, move)
+        if state.completes(piece, move): score += self.WIN
+        elif state.completes("1" if piece == "2" else "2", move): score += self.BLOCK
+        if move in self.get_killers(ply): score += self.KILLER
+        return score
+
+    def order(self, actions: list, ply: int, state, best_move = None) -> list:
+        return sorted(actions, key = lambda action: self.score(action, ply, state, best_move), reverse = True)
+
+    def cutoff(self, action, ply: int, depth: int, index: int) -> None:
+        '''Records that action, searched index-th at ply with depth plies left, caused a cutoff.'''
+        move = action[1]
+        killers = self.get_killers(ply)
+        if move not in killers:
+            killers.pop()
+            killers.insert(0, move)
+        self.history[move] = self.history.get(move, 0) + depth * depth
+        self.cutoffs += 1
+        if index == 0: self.first_cutoffs += 1
@@ -0,0 +1,79 @@
+import numpy as np
+from algs.evaluation import get_evaluator, OWNER
+
+DRAW = 3
+
+class BatchRollout:
+    """
+    Plays many random continuations of one position at once, as NumPy arrays.
+
+    The boards are stacked in a (size, n * m + 2) array of cells (0 empty, 1 or 2), row-major as in Evaluator.cells.
+    Cell n * m is the always empty sentinel of the evaluator's rays, cell n * m + 1 an always full one padding the entry lines.
+    Every step moves all the games still running at once:
+        legal moves: the first empty cell of every entry line, seen from its edge (cells several entry points land on count once);
+        sampling: one legal cell drawn uniformly, the way MCTS.simulate draws one child;
+        win check: a window of 4 cells through the cell just filled that holds only the piece just placed.
+    A game stops on a win, on a full board, or after depth + 1 moves, like MCTS.simulate.
+
+    Attributes:
+        evaluator: Evaluator of the board size, scoring the games that were stopped by the depth.
+        lines: lines[e] are the cells of entry point e, from its edge (padded with the full sentinel).
+        windows: windows[c] are the 4 in a row windows through cell c (padded with windows of the empty sentinel).
+    """
+    def __init__(self, n: int, m: int) -> None:
+        self.n, self.m = n, m
+        self.evaluator = get_evaluator(n, m)
+        size, full = n * m, n * m + 1
+
+        columns = [[i * m + j for i in range(n)] for j in range(m)]
+        rows = [[i * m + j for j in range(m)] for i in range(n)]
+        lines = columns + [column[::-1] for column in columns] + rows + [row[::-1] for row in rows]
+        self.lines = np.array([line + [full] * (max(n, m) - len(line)) for line in lines])
+        self.entries = np.arange(len(lines))
+
+        windows = [[] for _ in range(size)]
+        for i in range(n):
+            for j in range(m):
+                for di, dj in ((0,1), (1,0), (1,1), (1,-1)):
+                    line = [(i + k * di, j + k * dj) for k in range(4)]
+                    if all(-1 < u < n and -1 < v < m for u, v in line):
+                        for u, v in line: windows[u * m + v].append([a * m + b for a, b in line])
+        count = max(len(cell) for cell in windows)
+        self.windows = np.array([cell + [[size] * 4] * (count - len(cell)) for cell in windows])
+
+    def play(self, bits, piece: str, depth: int, size: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray, str]:
+        '''Plays size games from the position of bits, piece to move.
+        Returns the winner of every game (0 still running, 1 or 2, DRAW), the final boards and the side to move in the running games.'''
+        cells = self.n * self.m
+        board = np.empty(cells + 2, np.int8)
+        board[:-1], board[-1] = self.evaluator.cells(bits), DRAW
+        boards = np.tile(board, (size, 1))
+        winners = np.zeros(size, np.int8)
+        running, turn = np.arange(size), OWNER[piece]
+
+        for _ in range(depth + 1):
+            current = boards[running]
+            games = np.arange(len(running))
+            empty = current[:, self.lines] == 0
+            landing = np.where(empty.any(axis = 2), self.lines[self.entries, empty.argmax(axis = 2)], cells + 1)
+            legal = np.zeros(current.shape, bool)
+            legal[games[:, None], landing] = True
+            legal[:, -1] = False
+
+            moves = np.where(legal, rng.random(legal.shape), -1).argmax(axis = 1)
+            current[games, moves] = turn
+            boards[running] = current
+            wins = (current[games[:, None, None], self.windows[moves]] == turn).all(axis = 2).any(axis = 1)
+            draws = ~wins & (current[:, :cells] != 0).all(axis = 1)
+            winners[running[wins]], winners[running[draws]] = turn, DRAW
+
+            running = running[~(wins | draws)]
+            if not running.size: break
+            turn = 3 - turn
+        return winners, boards, "1" if turn == 1 else "2"
+
+ROLLOUTS = dict()
+
+def get_rollouts(n: int, m: int) -> BatchRollout:
+    if (n, m) not in ROLLOUTS: ROLLOUTS[(n, m)] = BatchRollout(n, m)
+    return ROLLOUTS[(n, m)]
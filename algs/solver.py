@@ -0,0 +1,95 @@
+from time import time
+from algs.transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+WIN, DRAW, LOSS = 1, 0, -1
+
+class Solver:
+    """
+    Exact solver of late positions: a negamax alpha-beta search to the end of the game over the values win (1), draw (0) and
+    loss (-1) of the side to move, so a result it returns is proven, not estimated.
+
+    The window is never wider than (-1, 1), so most nodes are cut off after one child. Threats prune the rest: a move
+    completing 4 in a row wins at once, and if the opponent completes 4 in a row on a legal cell, that cell is the only move
+    (two such cells lose). Results are kept in a transposition table of the solver (the depth of an entry being the number
+    of empty cells), which is never cleared: game values do not depend on the search that found them.
+
+    Attributes:
+        table: Transposition table, table_size bytes large.
+        max_time: Seconds a solve() may take before it gives up (None for no limit).
+        nodes: Positions visited by the last solve().
+        aborted: Whether the last solve() ran out of time or was stopped.
+
+    Methods:
+        solve(board, piece, stopped) -> (value, move) | None: Solves board for piece to move.
+        search(board, piece, opponent, alpha, beta, ply) -> int | None: Value of board for piece within (alpha, beta).
+    """
+    def __init__(self, table_size: int = 1 << 22, max_time: float = None) -> None:
+        self.table = TranspositionTable(table_size)
+        self.max_time = max_time
+        self.nodes, self.aborted, self.best = 0, False, None
+        self.deadline, self.stopped = None, None
+
+    def get_nodes(self) -> int: return self.nodes
+    def get_max_time(self) -> float: return self.max_time
+    def set_max_time(self, max_time: float) -> None: self.max_time = max_time
+
+    def solve(self, board, piece: str, stopped = None) -> tuple[int, tuple[int, int]] | None:
+        '''(value, move) of board for piece to move, value being WIN, DRAW or LOSS under perfect play of both sides and move
+        one that achieves it; None if max_time ran out or stopped() returned True first. board is left unchanged.'''
+        if board.is_full(): return None
+        self.nodes, self.aborted, self.best = 0, False, None
+        self.deadline = None if self.max_time is None else time() + self.max_time
+        self.stopped = stopped
+        self.table.new_search()
+        state = board.copy()
+        state.accumulator = None # the solver never evaluates, so it does not keep the accumulator up to date
+        value = self.search(state, piece, "2" if piece == "1" else "1", LOSS, WIN, 0)
+        return None if value is None else (value, self.best)
+
+    def out_of_time(self) -> bool:
+        if self.deadline is not None and time() > self.deadline: return True
+        return self.stopped is not None and self.stopped()
+
+    def search(self, board, piece: str, opponent: str, alpha: int, beta: int, ply: int) -> int | None:
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and self.out_of_time(): self.aborted = True
+        if self.aborted: return None
+
+        moves = board.get_legal_moves()
+        for move in moves:
+            if board.completes(piece, move):
+                if ply == 0: self.best = move
+                return WIN
+        threats = [move for move in moves if board.completes(opponent, move)]
+        if len(threats) > 1:
+            if ply == 0: self.best = threats[0]
+            return LOSS
+        if threats: moves = threats
+
+        tables = board.bits.tables
+        key, start = board.get_key(opponent), alpha
+        entry = self.table.probe(key)
+        if entry is not None:
+            _, stored, flag, index = entry
+            if ply > 0 and (flag == EXACT or flag == LOWER and stored >= beta or flag == UPPER and stored <= alpha): return int(stored)
+            if index >= 0 and tables.coords[index] in moves:
+                first = tables.coords[index]
+                moves = [first] + [move for move in moves if move != first]
+
+        value, best = LOSS - 1, None
+        for move in moves:
+            board.place_piece(piece, move)
+            if board.is_full(): child = DRAW
+            else:
+                child = self.search(board, opponent, piece, -beta, -alpha, ply + 1)
+                if child is not None: child = -child
+            board.remove_piece(move)
+            if child is None: return None
+            if child > value: value, best = child, move
+            alpha = max(alpha, value)
+            if alpha >= beta: break
+
+        flag = UPPER if value <= start else LOWER if value >= beta else EXACT
+        self.table.store(key, board.get_empty_count(), value, flag, tables.index[best[0]][best[1]])
+        if ply == 0: self.best = best
+        return value
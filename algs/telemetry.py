@@ -0,0 +1,86 @@
+from time import perf_counter
+import json
+
+class Telemetry:
+    """
+    Record of one search: opened by the search through its sink, filled while it runs and handed back to the sink at the end.
+
+    Attributes:
+        algorithm: Name of the search.
+        counters: Totals set by the search (nodes, created, evaluations, cutoffs, playouts, peak_tree...).
+        timers: timers[category] = [calls, seconds] of the MDP functions timed during the search (see MDP.instrument):
+                movegen (get_actions), terminal (state_analysis), evaluation (qfunction) and rollout.
+        plies: plies[ply] = [expanded nodes, children generated] at that ply.
+        elapsed: Duration of the search in seconds.
+    """
+    def __init__(self, algorithm: str) -> None:
+        self.algorithm = algorithm
+        self.counters, self.timers, self.plies = dict(), dict(), []
+        self.start, self.elapsed = perf_counter(), 0
+
+    def get_timer(self, category: str) -> list:
+        if category not in self.timers: self.timers[category] = [0, 0.]
+        return self.timers[category]
+    def get_calls(self, category: str) -> int: return self.timers[category][0] if category in self.timers else 0
+    def get_branching(self) -> list[float]: return [children / max(expanded, 1) for expanded, children in self.plies]
+
+    def count(self, **counters) -> None: self.counters.update(counters)
+    def maximum(self, name: str, value: int) -> None: self.counters[name] = max(self.counters.get(name, value), value)
+    def expanded(self, ply: int, children: int) -> None:
+        while len(self.plies) <= ply: self.plies.append([0, 0])
+        self.plies[ply][0] += 1
+        self.plies[ply][1] += children
+
+    def finish(self):
+        self.elapsed = perf_counter() - self.start
+        return self
+
+    def to_dict(self) -> dict:
+        return {"algorithm": self.algorithm, "elapsed": self.elapsed, **self.counters,
+                "timers": {category: {"calls": calls, "seconds": seconds} for category, (calls, seconds) in self.timers.items()},
+                "branching": self.get_branching()}
+
+class Timed:
+    """ Calls function, adding the call and its duration to timer ([calls, seconds]). Picklable if function is. """
+    def __init__(self, function, timer: list) -> None: self.function, self.timer = function, timer
+    def __call__(self, *args, **kwargs):
+        start = perf_counter()
+        result = self.function(*args, **kwargs)
+        self.timer[0] += 1
+        self.timer[1] += perf_counter() - start
+        return result
+
+class Sink:
+    """
+    Destination of the telemetry of the searches it is set on (set_sink). open() starts the record of a search, emit() receives it.
+    enabled False makes the searches skip the record entirely, so nothing is counted or timed; verbose lets the bots print
+    their boards and progress.
+    """
+    enabled, verbose = True, False
+    def open(self, algorithm: str) -> Telemetry | None: return Telemetry(algorithm) if self.enabled else None
+    def emit(self, record: Telemetry) -> None: raise NotImplementedError
+
+class NullSink(Sink):
+    """ Telemetry and printing turned off. """
+    enabled = False
+    def emit(self, record: Telemetry) -> None: pass
+
+class MemorySink(Sink):
+    """ Keeps every record, as a dict, in records. """
+    def __init__(self) -> None: self.records = []
+    def emit(self, record: Telemetry) -> None: self.records.append(record.to_dict())
+
+class JsonLinesSink(Sink):
+    """ Appends every record, with the fields of tags, to the file at path as one line of JSON (one write per line, so processes can share the file). """
+    def __init__(self, path: str, tags: dict = None) -> None: self.path, self.tags = path, tags or dict()
+    def emit(self, record: Telemetry) -> None:
+        with open(self.path, "a") as file: file.write(json.dumps({**self.tags, **record.to_dict()}) + "\n")
+
+class PrintSink(Sink):
+    """ Prints a summary of every record, the default of the searches. """
+    verbose = True
+    def emit(self, record: Telemetry) -> None:
+        value = lambda value: round(value, 3) if isinstance(value, float) else value
+        print(f"{record.algorithm} in {round(record.elapsed, 3)}s: " + ", ".join(f"{name} {value(count)}" for name, count in record.counters.items()))
+        if record.timers: print("Time: " + ", ".join(f"{category} {round(seconds, 3)}s ({calls} calls)" for category, (calls, seconds) in record.timers.items()))
+        if record.plies: print("Branching per ply: " + " ".join(str(round(branching, 1)) for branching in record.get_branching()))
@@ -0,0 +1,73 @@
+from array import array
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+class TranspositionTable:
+    """
+    Fixed-size transposition table indexed by the Zobrist key of a position.
+
+    Entries live in preallocated typed arrays, so the memory footprint is exactly slots * ENTRY_SIZE bytes.
+    An entry stores the remaining search depth, a score with its bound type (EXACT, LOWER or UPPER) and the
+    best move found as a cell bit index (-1 if none).
+
+    Replacement policy: a slot is overwritten when it is empty, holds the same position, was written by an
+    older search, or holds a shallower (or equally deep) result than the new one.
+
+    Attributes:
+        size: Memory budget in bytes.
+        slots: Number of entries.
+        age: Search generation, increased with new_search().
+        hits, misses, cutoffs, stores: Counters since the last reset_stats().
+    """
+    ENTRY_SIZE = 21 # key 8, value 8, move 2, depth 1, flag 1, age 1
+
+    def __init__(self, size: int = 1 << 22) -> None:
+        self.size = size
+        self.slots = max(1, size // self.ENTRY_SIZE)
+        self.owner = None
+        self.clear()
+
+    def clear(self) -> None:
+        self.keys = array("Q", bytes(8 * self.slots))
+        self.values = array("d", bytes(8 * self.slots))
+        self.moves = array("h", [-1]) * self.slots
+        self.depths = array("b", [-1]) * self.slots
+        self.flags = array("B", bytes(self.slots))
+        self.ages = array("B", bytes(self.slots))
+        self.age = 0
+        self.reset_stats()
+
+    def reset_stats(self) -> None: self.hits = self.misses = self.cutoffs = self.stores = 0
+    def new_search(self) -> None: self.age = (self.age + 1) % 256
+
+    def get_owner(self): return self.owner
+    def set_owner(self, owner) -> None:
+        '''Scores are only comparable between searches with the same owner (e.g. the same maximizing piece), so a new owner clears the table.'''
+        if owner != self.owner: self.clear()
+        self.owner = owner
+
+    def probe(self, key: int) -> tuple[int, float, int, int] | None:
+        '''Returns (depth, value, flag, move) of key, or None if it is not stored.'''
+        slot = key % self.slots
+        if self.depths[slot] < 0 or self.keys[slot] != key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.depths[slot], self.values[slot], self.flags[slot], self.moves[slot]
+
+    def get_move(self, key: int) -> int:
+        slot = key % self.slots
+        if self.depths[slot] < 0 or self.keys[slot] != key: return -1
+        return self.moves[slot]
+
+    def store(self, key: int, depth: int, value: float, flag: int, move: int = -1) -> None:
+        slot = key % self.slots
+        if self.depths[slot] >= 0 and self.keys[slot] != key and self.ages[slot] == self.age and self.depths[slot] > depth: return
+        if move < 0 and self.keys[slot] == key: move = self.moves[slot]
+        self.keys[slot], self.values[slot], self.moves[slot] = key, value, move
+        self.depths[slot], self.flags[slot], self.ages[slot] = depth, flag, self.age
+        self.stores += 1
+
+    def usage(self) -> float:
+        '''Fraction of the slots in use.'''
+        return 1 - self.depths.count(-1) / self.slots
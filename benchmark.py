@@ -0,0 +1,197 @@
+from algs.mdp import MDP
+from algs.mdpfunctions import state_analysis, get_actions, execute, make, unmake, rollout, qfunction, qfunction3, qfunction4
+from algs.mdpfunctions import check_win, check_draw, legal_moves, heuristic1, heuristic2
+from algs.evaluation import evaluate1, evaluate2, get_evaluator
+from algs.telemetry import NullSink
+from game.bots import Bot1, Bot2, Bot3
+from game.objects import Board, Node
+from functools import partial
+from time import perf_counter
+import argparse, json, platform, random, subprocess, sys
+
+# Benchmarks of the move generator, the searches and the evaluations, e.g.
+#   python benchmark.py --json before.json
+#   python benchmark.py --json after.json --compare before.json
+# Perft counts are exact: a count that changes between two runs means the rules changed, and makes --compare fail.
+
+STATE = partial(state_analysis, checkWin = check_win, checkDraw = check_draw)
+ACTIONS = partial(get_actions, get_legal_moves = legal_moves)
+
+def position(size: int, name: str) -> Board:
+    '''Standard positions of an n x n board: "empty", "corners" (the four corners taken, 1 and 2 alternating) and "threes"
+    (three in a row along the top and the bottom edge for 1 and 2, 1 to move), where games end within the perft depth.'''
+    board = Board(size, size)
+    if name == "corners":
+        for piece, move in zip("1212", ((0, 0), (size - 1, size - 1), (0, size - 1), (size - 1, 0))): board.place_piece(piece, move)
+    if name == "threes":
+        for j in range(3):
+            board.place_piece("1", (0, j))
+            board.place_piece("2", (size - 1, j))
+    return board
+
+POSITIONS = ("empty", "corners", "threes")
+
+def perft(mdp: MDP, node: Node, depth: int) -> tuple[int, int]:
+    '''(positions depth moves away from node, games ended on the way), through get_actions, execute and the terminal test.'''
+    if depth == 0: return 1, 0
+    nodes, ended = 0, 0
+    for action in mdp.get_actions(node):
+        child = mdp.execute(node, action)
+        if not mdp.non_terminal(child):
+            ended += 1
+            continue
+        child_nodes, child_ended = perft(mdp, child, depth - 1)
+        nodes, ended = nodes + child_nodes, ended + child_ended
+    return nodes, ended
+
+def perft_make(board: Board, piece: str, depth: int) -> tuple[int, int]:
+    '''perft() on one board with place_piece/remove_piece, as the depth-first searches walk it; the counts must be the same.'''
+    if depth == 0: return 1, 0
+    nodes, ended, opponent = 0, 0, "2" if piece == "1" else "1"
+    for move in board.get_legal_moves():
+        board.place_piece(piece, move)
+        if board.wins_at(piece, move) or board.is_full(): ended += 1
+        else:
+            child_nodes, child_ended = perft_make(board, opponent, depth - 1)
+            nodes, ended = nodes + child_nodes, ended + child_ended
+        board.remove_piece(move)
+    return nodes, ended
+
+def bench_perft(sizes: list[int], depth: int) -> list[dict]:
+    results = []
+    mdp = MDP(ACTIONS, STATE, execute, qfunction3, make, unmake)
+    for size in sizes:
+        for name in POSITIONS:
+            board = position(size, name)
+            start = perf_counter()
+            nodes, ended = perft(mdp, Node(board, None, ("2", None)), depth)
+            seconds = perf_counter() - start
+            start = perf_counter()
+            counts = perft_make(board.copy(), "1", depth)
+            make_seconds = perf_counter() - start
+            if counts != (nodes, ended): raise AssertionError(f"perft {size}x{size} {name}: execute counts {(nodes, ended)}, make/unmake counts {counts}")
+            visited = nodes + ended
+            results.append({"size": size, "position": name, "depth": depth, "nodes": nodes, "ended": ended,
+                            "nodes_per_second": visited / seconds, "make_nodes_per_second": visited / make_seconds})
+    return results
+
+def build_bots(board: Board, depth_ab: int, depth_n: int, time_mc: float) -> dict:
+    mdp = lambda heuristic, *args: MDP(ACTIONS, STATE, execute, heuristic, make, unmake, *args)
+    return {
+        "alphabeta": Bot2(board, "alphabeta", depth_ab, mdp(qfunction3), book = False),
+        "negamax": Bot1(board, "negamax", depth_n, mdp(qfunction4), book = False),
+        "mcts": Bot3(board, "mcts", time_mc, 1 << 24, 20, .1, mdp(qfunction, partial(rollout, size = 64)), book = False)
+    }
+
+def bench_search(sizes: list[int], depth_ab: int, depth_n: int, time_mc: float) -> list[dict]:
+    '''Nodes per second of each search from the corners position, AlphaBeta and Negamax to a fixed depth, MCTS for a fixed time
+    (its nodes are playouts).'''
+    results = []
+    for size in sizes:
+        board = position(size, "corners")
+        for name, bot in build_bots(board, depth_ab, depth_n, time_mc).items():
+            random.seed(0)
+            bot.set_sink(NullSink())
+            start = perf_counter()
+            bot.think("1", board)
+            seconds = perf_counter() - start
+            budget = {"alphabeta": f"depth {depth_ab}", "negamax": f"depth {depth_n}", "mcts": f"{time_mc}s"}[name]
+            results.append({"size": size, "search": name, "budget": budget, "nodes": bot.get_nodes(), "seconds": seconds, "nodes_per_second": bot.get_nodes() / seconds})
+    return results
+
+def random_positions(size: int, count: int, rng: random.Random) -> list[Board]:
+    positions = []
+    while len(positions) < count:
+        board, piece = Board(size, size), "1"
+        for _ in range(rng.randrange(1, size * size // 2)):
+            move = rng.choice(board.get_legal_moves())
+            board.place_piece(piece, move)
+            if board.wins_at(piece, move) or board.is_full(): break
+            piece = "2" if piece == "1" else "1"
+        else: positions.append(board)
+    return positions
+
+def bench_eval(sizes: list[int], seconds: float) -> list[dict]:
+    '''Evaluations per second over random positions of: the scalar heuristics on the grid, the vectorized Evaluator from scratch,
+    evaluate1/evaluate2 read from the board's accumulator, and evaluate1 after a move as a search sees it (place, evaluate, remove).'''
+    def after_move(board: Board) -> float:
+        move = board.get_legal_moves()[0]
+        board.place_piece("1", move)
+        value = evaluate1(board, "2", "1")
+        board.remove_piece(move)
+        return value
+
+    evaluations = {
+        "heuristic1": lambda board: heuristic1(board.get_grid(), "1", "2"),
+        "heuristic2": lambda board: heuristic2(board.get_grid(), "1", "2"),
+        "evaluator": lambda board: get_evaluator(board.get_rows(), board.get_columns()).score(board.bits, "1", "2", 5, .5, 1),
+        "evaluate1": lambda board: evaluate1(board, "1", "2"),
+        "evaluate2": lambda board: evaluate2(board, "1", "2"),
+        "evaluate1_move": after_move
+    }
+    results = []
+    for size in sizes:
+        boards = random_positions(size, 64, random.Random(size))
+        for name, evaluate in evaluations.items():
+            count, start = 0, perf_counter()
+            while perf_counter() - start < seconds:
+                for board in boards: evaluate(board)
+                count += len(boards)
+            results.append({"size": size, "evaluation": name, "evaluations_per_second": count / (perf_counter() - start)})
+    return results
+
+def get_meta() -> dict:
+    try: commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True).stdout.strip()
+    except OSError: commit = ""
+    return {"python": sys.version.split()[0], "platform": platform.platform(), "processor": platform.processor(), "commit": commit}
+
+def compare(results: dict, baseline: dict) -> bool:
+    '''Prints the speed of every benchmark relative to baseline; False if a perft count differs.'''
+    exact, keys = True, {"perft": ("size", "position", "depth"), "search": ("size", "search", "budget"), "eval": ("size", "evaluation")}
+    for part, fields in keys.items():
+        old = {tuple(entry[field] for field in fields): entry for entry in baseline.get(part, [])}
+        for entry in results.get(part, []):
+            key = tuple(entry[field] for field in fields)
+            if key not in old: continue
+            if part == "perft" and (entry["nodes"], entry["ended"]) != (old[key]["nodes"], old[key]["ended"]):
+                print(f"perft {key}: {entry['nodes']}/{entry['ended']} positions/ended, baseline {old[key]['nodes']}/{old[key]['ended']}")
+                exact = False
+            speed = "evaluations_per_second" if part == "eval" else "nodes_per_second"
+            print(f"{part:<7} {' '.join(map(str, key)):<28} x{entry[speed] / old[key][speed]:.2f}")
+    return exact
+
+def print_results(results: dict) -> None:
+    for entry in results.get("perft", []):
+        print(f"perft   {entry['size']}x{entry['size']} {entry['position']:<8} depth {entry['depth']}: {entry['nodes']:>9} positions {entry['ended']:>7} ended"
+              f"  {entry['nodes_per_second']:>9.0f} nodes/s (execute) {entry['make_nodes_per_second']:>9.0f} nodes/s (make)")
+    for entry in results.get("search", []):
+        print(f"search  {entry['size']}x{entry['size']} {entry['search']:<10} {entry['budget']:<8} {entry['nodes']:>9} nodes {entry['nodes_per_second']:>9.0f} nodes/s")
+    for entry in results.get("eval", []):
+        print(f"eval    {entry['size']}x{entry['size']} {entry['evaluation']:<10} {entry['evaluations_per_second']:>9.0f} evaluations/s")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = "Perft, search and evaluation benchmarks.")
+    parser.add_argument("--only", nargs = "+", choices = ("perft", "search", "eval"), default = ["perft", "search", "eval"])
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [5, 6, 7, 8], help = "board sizes, n for an n x n board")
+    parser.add_argument("--perft-depth", type = int, default = 3)
+    parser.add_argument("--ab-depth", type = int, default = 6, help = "depth of the AlphaBeta search")
+    parser.add_argument("--negamax-depth", type = int, default = 4)
+    parser.add_argument("--mcts-time", type = float, default = 1., help = "seconds of the MCTS search")
+    parser.add_argument("--eval-time", type = float, default = .5, help = "seconds per evaluation function and size")
+    parser.add_argument("--json", help = "write the results to this file")
+    parser.add_argument("--compare", help = "results of an earlier run to compare with; exits with 1 if a perft count differs")
+    args = parser.parse_args()
+
+    results = {"meta": get_meta()}
+    if "perft" in args.only: results["perft"] = bench_perft(args.sizes, args.perft_depth)
+    if "search" in args.only: results["search"] = bench_search(args.sizes, args.ab_depth, args.negamax_depth, args.mcts_time)
+    if "eval" in args.only: results["eval"] = bench_eval(args.sizes, args.eval_time)
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w") as file: json.dump(results, file, indent = 2)
+    if args.compare:
+        with open(args.compare) as file: baseline = json.load(file)
+        if not compare(results, baseline): sys.exit(1)
+
+if __name__ == "__main__": main()
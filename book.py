@@ -0,0 +1,82 @@
+from algs.mdp import MDP
+from algs.mdpfunctions import state_analysis, get_actions, execute, make, unmake, qfunction3
+from algs.mdpfunctions import check_win, check_draw, legal_moves
+from algs.book import BOOKS, get_path, write_book
+from algs.telemetry import NullSink
+from game.bots import Bot2
+from game.objects import Board
+from functools import partial
+from multiprocessing import Pool
+from time import perf_counter
+import argparse, os, random
+
+# Builds the opening books read by the bots (resources/books/book<n>x<n>.bin), e.g.
+#   python book.py --sizes 5 6 7 8 --plies 3 --time 5
+# Every position of the first plies is searched by AlphaBeta for the given time. Symmetric positions are searched apart: the
+# evaluation is not symmetric, so the best move of one orientation is not always the mirror of the best move of another.
+
+def get_positions(size: int, plies: int) -> list[tuple[Board, str]]:
+    '''(board, piece to move) of every position reached in fewer than plies plies from the empty board, one per Zobrist key,
+    piece "1" moving first; positions already won are left out.'''
+    layer, positions, seen = [(Board(size, size), "1")], [], set()
+    for _ in range(plies):
+        following = []
+        for board, piece in layer:
+            positions.append((board, piece))
+            opponent = "2" if piece == "1" else "1"
+            for move in board.get_legal_moves():
+                child = board.copy()
+                child.place_piece(piece, move)
+                key = child.get_key(piece)
+                if key in seen or child.wins_at(piece, move) or child.is_full(): continue
+                seen.add(key)
+                following.append((child, opponent))
+        layer = following
+    return positions
+
+SEARCHERS = dict()
+
+def get_searcher(size: int, table: int, seconds: float) -> Bot2:
+    '''One AlphaBeta bot per worker and board size, so its transposition table stays warm from one position to the next.'''
+    if size not in SEARCHERS:
+        state = partial(state_analysis, checkWin = check_win, checkDraw = check_draw)
+        actions = partial(get_actions, get_legal_moves = legal_moves)
+        mdp = MDP(actions, state, execute, qfunction3, make, unmake)
+        SEARCHERS[size] = Bot2(Board(size, size), "book", size * size, mdp, table, seconds, book = False)
+        SEARCHERS[size].set_sink(NullSink())
+    return SEARCHERS[size]
+
+def search_position(task: tuple) -> tuple[int, tuple[int, int]]:
+    '''(Zobrist key, (move bit index, completed depth)) of the search of one position.'''
+    board, piece, table, seconds, seed = task
+    random.seed(seed)
+    bot = get_searcher(board.get_rows(), table, seconds)
+    move = bot.think(piece, board)
+    return board.get_key("2" if piece == "1" else "1"), (board.bits.tables.index[move[0]][move[1]], bot.completed_depth)
+
+def build(size: int, plies: int, seconds: float, table: int, workers: int, directory: str) -> str:
+    positions = get_positions(size, plies)
+    tasks = [(board, piece, table, seconds, seed) for seed, (board, piece) in enumerate(positions)]
+    entries, start = dict(), perf_counter()
+    with Pool(workers) as pool:
+        for done, (key, entry) in enumerate(pool.imap_unordered(search_position, tasks), 1):
+            entries[key] = entry
+            print(f"\r{size}x{size}: {done}/{len(tasks)} positions", end = "", flush = True)
+    path = get_path(size, size, directory)
+    write_book(path, size, size, plies, entries)
+    depths = [depth for _, depth in entries.values()]
+    print(f"\r{size}x{size}: {len(entries)} positions, depth {min(depths)}-{max(depths)}, {round(perf_counter() - start, 1)}s -> {path}")
+    return path
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = "Builds the opening books of the bots by searching every position of the first plies.")
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [5, 6, 7, 8], help = "board sizes, n for an n x n board")
+    parser.add_argument("--plies", type = int, default = 3, help = "the book covers the positions with fewer pieces than this")
+    parser.add_argument("--time", type = float, default = 5., help = "seconds of search per position")
+    parser.add_argument("--table", type = int, default = 1 << 24, help = "bytes of the transposition table of each worker")
+    parser.add_argument("--workers", type = int, default = os.cpu_count() or 1)
+    parser.add_argument("--dir", default = BOOKS, help = "directory of the books")
+    args = parser.parse_args()
+    for size in args.sizes: build(size, args.plies, args.time, args.table, args.workers, args.dir)
+
+if __name__ == "__main__": main()
@@ -0,0 +1,262 @@
+from random import Random
+
+PIECES = ("1", "2")
+INDEX = {"1": 0, "2": 1, 1: 0, 2: 1}
+
+# Symmetries of the board as (i, j, n, m) -> (u, v); the first 4 keep an n x m rectangle, all 8 need a square board
+SYMMETRIES = (
+    lambda i, j, n, m: (i, j),
+    lambda i, j, n, m: (i, m - 1 - j),
+    lambda i, j, n, m: (n - 1 - i, j),
+    lambda i, j, n, m: (n - 1 - i, m - 1 - j),
+    lambda i, j, n, m: (j, i),
+    lambda i, j, n, m: (j, n - 1 - i),
+    lambda i, j, n, m: (m - 1 - j, i),
+    lambda i, j, n, m: (m - 1 - j, n - 1 - i),
+)
+
+class BitTables:
+    """
+    Precomputed shift/mask tables of an n x m SpiderLine4 board.
+
+    Cells are laid out row by row with one padding bit at the end of every row (stride m + 1),
+    so shifting a mask by the stride of a direction never wraps a line onto the next row.
+
+    Attributes:
+        n, m: Number of rows and columns.
+        stride: Distance in bits between two vertically adjacent cells.
+        cells: cells[i][j] is the single bit mask of cell (i, j).
+        rows, columns: Masks of every row and column.
+        full: Mask of every cell on the board.
+        index: index[i][j] is the bit index of cell (i, j).
+        coords: coords[b] is the (i, j) tuple of bit index b (None on padding bits).
+        shifts: Bit stride of each of the 8 direction vectors (opposite vectors share a stride).
+        windows: windows[i][j] lists the masks of every 4 in a row line going through cell (i, j).
+        entries: (line mask, from the low end) of every edge entry point: top and bottom of each column, then left and right of each row.
+        zobrist: zobrist[INDEX[piece]][b] is the 64 bit key of piece on bit index b; the seed is fixed per board size,
+                 so hashes are the same in every process.
+        sides: 64 bit key of the side to move, mixed into the position hash by BitBoard.get_key.
+        symmetries: symmetries[t][i][j] is cell (i, j) under symmetry t (8 on square boards, 4 otherwise); pieces enter
+                    from all four edges, so the drop rule and the 4 in a row lines are the same under every one of them.
+        inverses: inverses[t] is the symmetry undoing t.
+        symmetric_keys: symmetric_keys[INDEX[piece]][b] holds the Zobrist key of piece on bit index b under every symmetry.
+    """
+    def __init__(self, n: int, m: int) -> None:
+        self.n, self.m = n, m
+        self.stride = m + 1
+        self.index = [[i * self.stride + j for j in range(m)] for i in range(n)]
+        self.cells = [[1 << self.index[i][j] for j in range(m)] for i in range(n)]
+        self.rows = [sum(row) for row in self.cells]
+        self.columns = [sum(self.cells[i][j] for i in range(n)) for j in range(m)]
+        self.full = sum(self.rows)
+        self.coords = [None] * (n * self.stride)
+        for i in range(n):
+            for j in range(m): self.coords[i * self.stride + j] = (i, j)
+
+        self.shifts = dict()
+        for vector, shift in (((0,1), 1), ((1,0), self.stride), ((1,1), self.stride + 1), ((1,-1), self.stride - 1)):
+            self.shifts[vector] = self.shifts[(-vector[0], -vector[1])] = shift
+
+        self.windows = [[[] for j in range(m)] for i in range(n)]
+        for i in range(n):
+            for j in range(m):
+                for di, dj in ((0,1), (1,0), (1,1), (1,-1)):
+                    line = [(i + k * di, j + k * dj) for k in range(4)]
+                    if all(-1 < u < n and -1 < v < m for u, v in line):
+                        window = sum(self.cells[u][v] for u, v in line)
+                        for u, v in line: self.windows[u][v].append(window)
+
+        self.entries = [(column, True) for column in self.columns] + [(column, False) for column in self.columns]
+        self.entries += [(row, True) for row in self.rows] + [(row, False) for row in self.rows]
+
+        rng = Random(n * 100 + m)
+        self.zobrist = [[rng.getrandbits(64) for _ in self.coords] for _ in PIECES]
+        self.sides = [rng.getrandbits(64) for _ in PIECES]
+
+        self.symmetries = [[[symmetry(i, j, n, m) for j in range(m)] for i in range(n)] for symmetry in SYMMETRIES[:8 if n == m else 4]]
+        self.inverses = [next(u for u, inverse in enumerate(self.symmetries) if all(inverse[a][b] == (i, j) for i, row in enumerate(cells) for j, (a, b) in enumerate(row)))
+                         for cells in self.symmetries]
+        self.symmetric_keys = [[None if cell is None else tuple(keys[self.index[u][v]] for u, v in (cells[cell[0]][cell[1]] for cells in self.symmetries))
+                                for cell in self.coords] for keys in self.zobrist]
+
+TABLES = {(n, n): BitTables(n, n) for n in range(5, 9)}
+
+def get_tables(n: int, m: int) -> BitTables:
+    if (n, m) not in TABLES: TABLES[(n, m)] = BitTables(n, m)
+    return TABLES[(n, m)]
+
+def iter_bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+class BitBoard:
+    """
+    Compact SpiderLine4 position: one integer mask per player, indexed by INDEX[piece].
+    Copying a position copies two integers and a line test is a handful of bit operations.
+    The number of empty cells and the Zobrist hashes of the position under every board symmetry (hashes[0] being the
+    position itself) are kept up to date on every place/remove; the smallest one is the canonical key of the position.
+    """
+    __slots__ = ("tables", "masks", "empty", "hashes")
+
+    def __init__(self, n: int, m: int) -> None:
+        self.tables = get_tables(n, m)
+        self.masks = [0, 0]
+        self.empty = n * m
+        self.hashes = [0] * len(self.tables.symmetries)
+
+    @staticmethod
+    def from_matrix(matrix):
+        bits = BitBoard(len(matrix), len(matrix[0]))
+        for i, row in enumerate(matrix):
+            for j, entry in enumerate(row):
+                if entry != "0": bits.place(entry, i, j)
+        return bits
+
+    def __eq__(self, other) -> bool: return isinstance(other, BitBoard) and self.tables is other.tables and self.masks == other.masks
+    def __getstate__(self): return (self.tables.n, self.tables.m), self.masks, self.empty, self.hashes
+    def __setstate__(self, state) -> None:
+        size, self.masks, self.empty, self.hashes = state
+        self.tables = get_tables(*size)
+
+    def copy(self):
+        bits = BitBoard.__new__(BitBoard)
+        bits.tables, bits.masks, bits.empty, bits.hashes = self.tables, self.masks[:], self.empty, self.hashes
+        return bits
+
+    def get_mask(self, piece: str) -> int: return self.masks[INDEX[piece]]
+    def get_occupied(self) -> int: return self.masks[0] | self.masks[1]
+    def get_empty(self) -> int: return self.tables.full & ~self.get_occupied()
+
+    def get(self, i: int, j: int) -> str:
+        cell = self.tables.cells[i][j]
+        if self.masks[0] & cell: return "1"
+        if self.masks[1] & cell: return "2"
+        return "0"
+    def is_empty(self, i: int, j: int) -> bool: return not self.get_occupied() & self.tables.cells[i][j]
+    def is_full(self) -> bool: return self.empty == 0
+    def get_empty_count(self) -> int: return self.empty
+    def get_hash(self) -> int: return self.hashes[0]
+    def get_key(self, side: str) -> int:
+        '''Hash of the position together with the piece that moved last, which tells whose turn it is.'''
+        return self.hashes[0] ^ self.tables.sides[INDEX[side]]
+    def get_transform(self) -> int:
+        '''Symmetry mapping the position to its canonical form, the one with the smallest hash.'''
+        return self.hashes.index(min(self.hashes))
+    def get_canonical(self, side: str) -> tuple[int, int]:
+        '''(key of the canonical form, get_transform()); symmetric positions share the same key.'''
+        transform = self.get_transform()
+        return self.hashes[transform] ^ self.tables.sides[INDEX[side]], transform
+
+    def transform(self, transform: int, i: int, j: int) -> tuple[int, int]: return self.tables.symmetries[transform][i][j]
+    def symmetries(self) -> list[int]:
+        '''Symmetries that leave the position unchanged (always including the identity, 0).'''
+        found = []
+        for transform, cells in enumerate(self.tables.symmetries):
+            if self.hashes[transform] != self.hashes[0]: continue
+            if all(sum(self.tables.cells[u][v] for u, v in (cells[i][j] for i, j in self.pieces(piece))) == self.get_mask(piece) for piece in PIECES):
+                found.append(transform)
+        return found
+
+    def place(self, piece: str, i: int, j: int) -> None:
+        index = INDEX[piece]
+        self.masks[index] |= self.tables.cells[i][j]
+        self.hashes = [hash ^ key for hash, key in zip(self.hashes, self.tables.symmetric_keys[index][self.tables.index[i][j]])]
+        self.empty -= 1
+    def remove(self, i: int, j: int) -> None:
+        cell = self.tables.cells[i][j]
+        index = 0 if self.masks[0] & cell else 1
+        self.masks[index] &= ~cell
+        self.hashes = [hash ^ key for hash, key in zip(self.hashes, self.tables.symmetric_keys[index][self.tables.index[i][j]])]
+        self.empty += 1
+
+    def wins_at(self, piece: str, i: int, j: int) -> bool:
+        '''True if piece has 4 in a row on one of the four lines through (i, j), i.e. if a piece placed there won.'''
+        mask = self.masks[INDEX[piece]]
+        for window in self.tables.windows[i][j]:
+            if mask & window == window: return True
+        return False
+
+    def completes(self, piece: str, i: int, j: int) -> bool:
+        '''True if placing piece on the empty cell (i, j) would give it 4 in a row.'''
+        mask = self.masks[INDEX[piece]] | self.tables.cells[i][j]
+        for window in self.tables.windows[i][j]:
+            if mask & window == window: return True
+        return False
+
+    def has_line(self, piece: str, vector: tuple[int, int]) -> bool:
+        '''True if piece has 4 in a row anywhere on the board along vector.'''
+        mask, shift = self.masks[INDEX[piece]], self.tables.shifts[vector]
+        pairs = mask & (mask >> shift)
+        return pairs & (pairs >> 2 * shift) != 0
+
+    def pieces(self, piece: str) -> list[tuple[int, int]]: return [self.tables.coords[b] for b in iter_bits(self.masks[INDEX[piece]])]
+    def grid(self) -> list[str]:
+        '''Row strings of the position, indexable like the old matrix ("0" empty, "1"/"2" pieces).'''
+        stride, m = self.tables.stride, self.tables.m
+        cells = ["0"] * (self.tables.n * stride)
+        for index, piece in enumerate(PIECES):
+            for b in iter_bits(self.masks[index]): cells[b] = piece
+        return ["".join(cells[i:i + m]) for i in range(0, len(cells), stride)]
+
+class MoveFrontier:
+    """
+    Legal move generator kept with a BitBoard.
+
+    A piece enters from one of the 2(n + m) edge entry points and lands on the first empty cell seen from that edge.
+    The frontier stores the landing cell of every entry point and how many entry points land on each cell, so placing
+    or removing a piece only recomputes the four entry points of its row and column, each with one bit scan.
+    The legal moves are the set bits of the legal mask; the move list is rebuilt only when that mask changes.
+    """
+    __slots__ = ("tables", "landing", "counts", "legal", "moves")
+
+    def __init__(self, bits: BitBoard) -> None:
+        self.tables = bits.tables
+        self.landing = [-1] * len(self.tables.entries)
+        self.counts = [0] * len(self.tables.coords)
+        self.legal = 0
+        self.moves = (0, [])
+        empty = bits.get_empty()
+        for entry in range(len(self.landing)): self.land(entry, empty)
+
+    def __getstate__(self): return (self.tables.n, self.tables.m), self.landing, self.counts, self.legal
+    def __setstate__(self, state) -> None:
+        size, self.landing, self.counts, self.legal = state
+        self.tables, self.moves = get_tables(*size), (0, [])
+
+    def copy(self):
+        frontier = MoveFrontier.__new__(MoveFrontier)
+        frontier.tables, frontier.landing, frontier.counts = self.tables, self.landing[:], self.counts[:]
+        frontier.legal, frontier.moves = self.legal, self.moves
+        return frontier
+
+    def land(self, entry: int, empty: int) -> None:
+        line, low = self.tables.entries[entry]
+        cells = empty & line
+        if not cells: cell = -1
+        elif low: cell = (cells & -cells).bit_length() - 1
+        else: cell = cells.bit_length() - 1
+
+        old = self.landing[entry]
+        if old == cell: return
+        if old >= 0:
+            self.counts[old] -= 1
+            if not self.counts[old]: self.legal ^= 1 << old
+        if cell >= 0:
+            if not self.counts[cell]: self.legal |= 1 << cell
+            self.counts[cell] += 1
+        self.landing[entry] = cell
+
+    def update(self, i: int, j: int, empty: int) -> None:
+        '''Recomputes the entry points whose line goes through (i, j) after it was filled or emptied.'''
+        m, n = self.tables.m, self.tables.n
+        self.land(j, empty)
+        self.land(m + j, empty)
+        self.land(2 * m + i, empty)
+        self.land(2 * m + n + i, empty)
+
+    def is_legal(self, i: int, j: int) -> bool: return self.legal & self.tables.cells[i][j] != 0
+    def get_moves(self) -> list[tuple[int, int]]:
+        if self.moves[0] != self.legal: self.moves = (self.legal, [self.tables.coords[b] for b in iter_bits(self.legal)])
+        return self.moves[1]
@@ -1,26 +1,71 @@
-from random import randint
+from random import randint, choice
 from algs.mdpfunctions import visualize_ab, visualize_negamax, visualize_montecarlo
 from algs.minimax import AlphaBeta
 from algs.negamax import Negamax
 from algs.montecarlo import MCTS
+from algs.book import get_book
+from algs.solver import Solver, LOSS
+from time import time
 import threading
 
+# the bots solve positions with at most SOLVE_EMPTY empty cells, for up to SOLVE_TIME seconds and half of their time per move
+SOLVE_EMPTY, SOLVE_TIME = 14, 1.
+
+def book_move(piece: str, state) -> tuple[int, int] | None:
+    '''Move of the opening book of the board size for piece on state, None out of the book.'''
+    return get_book(state.get_rows(), state.get_columns()).probe(state, piece)
+
+def solved_move(bot, piece: str, state, move_time: float = None) -> tuple[int, int] | None:
+    '''Proven move of piece on state once at most bot.solve_empty cells are empty, None before that, if the solver of the
+    bot did not finish in time or if the position is lost (the bot then searches for the rest of move_time: any move of a
+    lost position is proven to lose, and the search picks the one that resists an imperfect opponent best). The solver gets
+    SOLVE_TIME seconds, or half of move_time if that is shorter. The result goes to the sink of the bot as a Solver record.'''
+    if state.get_empty_count() > bot.solve_empty: return None
+    bot.solver.set_max_time(SOLVE_TIME if move_time is None else min(SOLVE_TIME, move_time / 2))
+    record = bot.get_sink().open("Solver")
+    result = bot.solver.solve(state, piece, bot.get_stop)
+    if record is not None:
+        record.count(nodes = bot.solver.get_nodes(), solved = result is not None, value = None if result is None else result[0])
+        bot.get_sink().emit(record.finish())
+    return None if result is None or result[0] == LOSS else result[1]
+
 class Bot0:
     def __init__(self, board, name: str) -> None: self.board, self.name = board, name
     def get_name(self) -> str: return self.name
     def play(self, piece: str, moves_func) -> None: self.board.place_piece(piece,moves_func()[randint(0,len(moves_func()) - 1)])
 
 class Bot1(Negamax):
-    def __init__(self, board, name: str, depth: int, mdp) -> None:
+    def __init__(self, board, name: str, depth: int, mdp, book: bool = True) -> None:
         super().__init__(board, 1, depth, mdp)
         self.board, self.name = board, name
+        self.book = book
+        self.solver, self.solve_empty = Solver(1 << 22, SOLVE_TIME), SOLVE_EMPTY
 
     def get_name(self) -> str: return self.name
-    
+    def get_nodes(self) -> int: return self.nodes_depth
+    def get_book(self) -> bool: return self.book
+    def set_book(self, book: bool) -> None: self.book = book
+    def get_solve_empty(self) -> int: return self.solve_empty
+    def set_solve_empty(self, solve_empty: int) -> None: self.solve_empty = solve_empty
     def play(self, piece: str) -> None:
-        print(f"{self.get_name()} evaluating...")
+        move = self.think(piece, self.board)
+        if move is not None: self.board.place_piece(piece, move)
+
+    def think(self, piece: str, state) -> tuple[int, int] | None:
+        '''Returns the book move of piece on state, or its proven move late in the game, if any, or searches state and returns
+        the chosen move (None if the search was stopped); state is left unchanged.'''
+        move = book_move(piece, state) if self.book else None
+        if move is not None:
+            self.nodes_depth = 0
+            if self.get_sink().verbose: print(f"{self.get_name()} plays {move} from the book")
+            return move
+        move = solved_move(self, piece, state)
+        if move is not None:
+            self.nodes_depth = self.solver.get_nodes()
+            return move
+        if self.get_sink().verbose: print(f"{self.get_name()} evaluating...")
 
-        self.root_state = self.board
+        self.root_state = state
         opponent = "2" if piece == "1" else "1"
         self.root_sign = -1 if opponent == "1" else 1
 
@@ -29,53 +74,200 @@ class Bot1(Negamax):
         root = self.negamax(opponent)
         if root == None: return
         best_nodes = [child for child in root.get_children() if child.get_reward() == self.root_sign * root.get_reward()]
-        visualize_negamax(root.get_children(), self.root_sign, self.board.matrix.shape[0])
+        if self.get_sink().verbose: visualize_negamax(root.get_children(), self.root_sign, state.get_rows())
 
-        move = best_nodes[randint(0, len(best_nodes) - 1)].get_action()[1]
-        self.board.place_piece(piece, move)
+        return best_nodes[randint(0, len(best_nodes) - 1)].get_action()[1]
 
 class Bot2(AlphaBeta):
-    def __init__(self, board, name: str, depth: int, mdp) -> None:
-        super().__init__(board, depth, mdp)
+    def __init__(self, board, name: str, depth: int, mdp, table_size: int = 1 << 22, max_time: float = None, book: bool = True) -> None:
+        super().__init__(board, depth, mdp, table_size)
         self.board, self.name = board, name
+        self.max_time = max_time
+        self.book = book
+        self.solver, self.solve_empty = Solver(1 << 22, SOLVE_TIME), SOLVE_EMPTY
 
     def get_name(self) -> str: return self.name
-    
+    def get_nodes(self) -> int: return self.nodes_depth
+    def get_book(self) -> bool: return self.book
+    def set_book(self, book: bool) -> None: self.book = book
+    def get_solve_empty(self) -> int: return self.solve_empty
+    def set_solve_empty(self, solve_empty: int) -> None: self.solve_empty = solve_empty
     def play(self, piece: str) -> None:
-        print(f"{self.get_name()} evaluating...")
+        move = self.think(piece, self.board)
+        if move is not None: self.board.place_piece(piece, move)
+
+    def think(self, piece: str, state) -> tuple[int, int] | None:
+        '''Returns the book move of piece on state, or its proven move late in the game, if any, or searches state and returns
+        the chosen move (None if the search was stopped); state is left unchanged.'''
+        move = book_move(piece, state) if self.book else None
+        if move is not None:
+            self.nodes_depth = 0
+            if self.get_sink().verbose: print(f"{self.get_name()} plays {move} from the book")
+            return move
+        start = time()
+        move = solved_move(self, piece, state, self.max_time)
+        if move is not None:
+            self.nodes_depth = self.solver.get_nodes()
+            return move
+        if self.get_sink().verbose: print(f"{self.get_name()} evaluating...")
         self.nodes_depth = 0
-        self.root_state = self.board
+        self.root_state = state
 
         opponent = "2" if piece == "1" else "1"
         self.mdp.action_type, self.mdp.action_type_opponent  = piece, opponent 
 
-        root = self.minimax(opponent)
-        if root == None: return
+        root = self.minimax(opponent) if self.max_time is None else self.iterative_minimax(opponent, self.max_time - (time() - start))
+        if root == None or self.get_stop(): return
 
         best_nodes = [child for child in root.get_children() if child.get_reward() == root.get_reward()]
-        visualize_ab(root.get_children(), self.board.matrix.shape[0])
+        if self.get_sink().verbose: visualize_ab(root.get_children(), state.get_rows())
+
+        return best_nodes[randint(0,len(best_nodes) - 1)].get_action()[1]
 
-        move = best_nodes[randint(0,len(best_nodes) - 1)].get_action()[1]
-        self.board.place_piece(piece, move)
+    def ponder(self, piece: str, state) -> None:
+        self.root_state = state
+        self.mdp.action_type, self.mdp.action_type_opponent = piece, "2" if piece == "1" else "1"
+        self.ponder_minimax(piece)
 
 class Bot3(MCTS):
-    def __init__(self, board, name: str, max_time: int, max_mem: int, depth: int, uct_const: int, mdp) -> None:
-        super().__init__(board, max_time, max_mem, depth, uct_const, mdp)
+    def __init__(self, board, name: str, max_time: int, max_mem: int, depth: int, uct_const: int, mdp, workers: int = 1, book: bool = True) -> None:
+        super().__init__(board, max_time, max_mem, depth, uct_const, mdp, workers, True)
         self.board = self.root_state
         self.name = name
+        self.playouts = 0
+        self.book = book
+        self.solver, self.solve_empty = Solver(1 << 22, SOLVE_TIME), SOLVE_EMPTY
 
     def get_name(self) -> str: return self.name
+    def get_nodes(self) -> int: return self.playouts
+    def get_book(self) -> bool: return self.book
+    def set_book(self, book: bool) -> None: self.book = book
+    def get_solve_empty(self) -> int: return self.solve_empty
+    def set_solve_empty(self, solve_empty: int) -> None: self.solve_empty = solve_empty
     def play(self, piece: str) -> None:
-        print(f"{self.get_name()} evaluating...")
+        move = self.think(piece, self.board)
+        if move is not None: self.board.place_piece(piece, move)
 
-        self.root_state = self.board
+    def think(self, piece: str, state) -> tuple[int, int] | None:
+        '''Returns the book move of piece on state, or its proven move late in the game, if any, or searches state and returns
+        the chosen move (None if the search was stopped); state is left unchanged.'''
+        move = book_move(piece, state) if self.book else None
+        if move is not None:
+            self.playouts = 0
+            if self.get_sink().verbose: print(f"{self.get_name()} plays {move} from the book")
+            return move
+        start, delta_time = time(), self.delta_time
+        move = solved_move(self, piece, state, delta_time)
+        if move is not None:
+            self.playouts = self.solver.get_nodes()
+            return move
+        if self.get_sink().verbose: print(f"{self.get_name()} evaluating...")
+
+        self.root_state = state
         opponent = "2" if piece == "1" else "1"
 
         self.mdp.action_type, self.mdp.action_type_opponent = piece, opponent
-        root = self.mcts(opponent)
+        self.delta_time = delta_time - (time() - start) # what the solver used is taken out of the time of the move
+        try: root = self.mcts(opponent) if self.get_workers() == 1 else self.parallel_mcts(opponent)
+        finally: self.delta_time = delta_time
+        self.playouts = self.rollouts
+        self.reset()
         if root == None: return
-        move = self.uct_select(root).get_action()[1]
+        if self.get_sink().verbose: visualize_montecarlo(root.get_children(), self.get_uct_const(), state.get_rows())
+        return self.uct_select(root).get_action()[1]
 
-        visualize_montecarlo(root.get_children(), self.get_uct_const(), self.board.matrix.shape[0])
-        self.board.place_piece(piece, move)
+    def ponder(self, piece: str, state) -> None:
+        self.root_state = state
+        self.mdp.action_type, self.mdp.action_type_opponent = piece, "2" if piece == "1" else "1"
+        self.ponder_mcts(piece)
         self.reset()
+
+class BotThread:
+    """
+    Runs a search of a bot on a copy of a position in a background thread, so the caller (the pygame loop) keeps running.
+    stop() interrupts the search through the bot's set_stop, waits for the thread and clears the flag again.
+
+    Subclasses implement run(piece, state).
+    """
+    def __init__(self) -> None: self.bot, self.thread = None, None
+
+    def is_running(self) -> bool: return self.thread is not None
+    def is_done(self) -> bool: return self.thread is not None and not self.thread.is_alive()
+    def get_bot(self): return self.bot
+
+    def start(self, bot, piece: str, state) -> None:
+        self.stop()
+        self.bot = bot
+        self.thread = threading.Thread(target = self.run, args = (piece, state.copy()), daemon = True)
+        self.thread.start()
+
+    def run(self, piece: str, state) -> None: raise NotImplementedError
+
+    def stop(self) -> None:
+        if self.thread is None: return
+        self.bot.set_stop(True)
+        self.thread.join()
+        self.bot.set_stop(False)
+        self.bot, self.thread = None, None
+
+class Search(BotThread):
+    """Searches the move of a bot: once is_done(), finish() returns (piece, move), move being None if the search was stopped."""
+    def start(self, bot, piece: str, state) -> None:
+        self.piece, self.move = piece, None
+        super().start(bot, piece, state)
+
+    def run(self, piece: str, state) -> None: self.move = self.bot.think(piece, state)
+
+    def finish(self) -> tuple[str, tuple[int, int] | None]:
+        self.thread.join()
+        self.bot, self.thread = None, None
+        return self.piece, self.move
+
+class Ponder(BotThread):
+    """
+    Lets a bot ponder(piece, state) while its opponent is to move: the bot searches the position after its own move, so its
+    next search starts warm (AlphaBeta from its transposition table, MCTS from its tree). Bots without ponder() stay idle.
+    release(bot) must be called before bot searches again.
+    """
+    def start(self, bot, piece: str, state) -> None:
+        self.stop()
+        if hasattr(bot, "ponder"): super().start(bot, piece, state)
+
+    def run(self, piece: str, state) -> None: self.bot.ponder(piece, state)
+
+    def release(self, bot) -> None:
+        '''Stops the ponder if bot is the bot pondering, before it searches; the ponder of another bot goes on.'''
+        if self.bot is bot: self.stop()
+
+class Analysis(BotThread):
+    """
+    Anytime analysis of a position for the eval bar and the hint: an AlphaBeta bot deepens its search in the background
+    (analyse_minimax) and every completed depth replaces the published result, read without blocking through get_depth(),
+    get_value() and get_hint(). The result is labelled with the key of the position it belongs to.
+
+    stop() keeps the key and the last result, so a paused analysis is not started again on the same position.
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self.key, self.result = None, None
+
+    def get_key(self): return self.key
+    def get_depth(self) -> int: return 0 if self.result is None else self.result[0]
+    def get_value(self) -> float | None: return None if self.result is None else self.result[1]
+    def get_hint(self) -> tuple[int, int] | None: return choice(self.result[2]) if self.result is not None and self.result[2] else None
+
+    def start(self, bot, piece: str, state, key = None) -> None:
+        self.stop()
+        self.key, self.result = key, None
+        super().start(bot, piece, state)
+
+    def run(self, piece: str, state) -> None:
+        '''piece is the piece that moved last: the value is scored for its opponent, the side to move.'''
+        self.bot.root_state = state
+        self.bot.mdp.action_type, self.bot.mdp.action_type_opponent = "2" if piece == "1" else "1", piece
+        self.bot.analyse_minimax(piece, self.publish)
+
+    def publish(self, depth: int, root) -> None:
+        '''Replaces the result with (depth, value, best moves) of a completed iteration.'''
+        value = root.get_reward()
+        self.result = depth, value, [child.get_action()[1] for child in root.get_children() if child.get_reward() == value]
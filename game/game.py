@@ -1,11 +1,15 @@
+from game import settings
+settings.init() # the UI starts with this module: pygame, the window and the images
 from game.settings import *
 from algs.mdp import MDP
-from algs.mdpfunctions import state_analysis, get_actions, execute, qfunction, qfunction1, qfunction3, qfunction4, softmax
-from game.bots import Bot1, Bot2, Bot3, AlphaBeta
+from algs.mdpfunctions import state_analysis, get_actions, execute, make, unmake, rollout, qfunction, qfunction3, qfunction4, softmax
+from algs.mdpfunctions import check_win, check_draw, legal_moves
+from game.bots import Bot1, Bot2, Bot3, AlphaBeta, Search, Ponder, Analysis
 from game.player import Player
-from game.objects import Board, Button, Clock, Node
-from copy import deepcopy
-from random import choice
+from game.objects import Board, PositionCache
+from game.widgets import Button, Clock
+from functools import partial
+import pygame, os
 
 class SpiderLine4:
     def __init__(self) -> None:
@@ -31,6 +35,7 @@ class SpiderLine4:
         # FPS
         self.ticks = 1000//FPS
         self.timer = 0
+        self.fps_clock = pygame.time.Clock()
 
         #music
         pygame.mixer.music.load("resources/assets/Wii.mp3")
@@ -43,21 +48,29 @@ class SpiderLine4:
         self.turn = 1
         self.display_switch = True
 
-        def state(node: Node): return state_analysis(node, self.checkWin, self.checkDraw)
-        def actions(node: Node): return get_actions(node, self.get_legal_moves)
-        def qfunction2(node: Node, opponent: str, player: str): return qfunction(node, opponent, player, self.checkWin, self.checkDraw)
+        # module level rules, so the MDPs can be sent to worker processes
+        state = partial(state_analysis, checkWin = check_win, checkDraw = check_draw)
+        actions = partial(get_actions, get_legal_moves = legal_moves)
 
         # entities
-        mdp = MDP(actions, state, execute, qfunction2)
-        mdp1 = MDP(actions, state, execute, qfunction3)
-        mdp2 = MDP(actions, state, execute, qfunction4)
-        TIME, MAX_NODES = 4, 1000 
+        ROLLOUTS = 64 # playouts per batched simulation of Bot3
+        mdp = MDP(actions, state, execute, qfunction, make, unmake, partial(rollout, size = ROLLOUTS))
+        mdp1 = MDP(actions, state, execute, qfunction3, make, unmake)
+        mdp2 = MDP(actions, state, execute, qfunction4, make, unmake)
+        TIME, MAX_MEM = 4, 1 << 25
         UCT_CONST = .1 * TIME
-        DEPTH_AB, DEPTH_N, DEPTH_M = 4, 3, 20
-        self.mdp1 = MDP(actions, state, execute, qfunction3)
-
-        self.bots = [Bot1(self.board, "NegaMax", DEPTH_N, mdp2), Bot2(self.board, "MiniMax", DEPTH_AB, mdp1), Bot3(self.board, "Monte Carlo", TIME, MAX_NODES, DEPTH_M, UCT_CONST, mdp)]
-        self.eval_bot = AlphaBeta(self.board, 2, mdp2)
+        DEPTH_N, DEPTH_M = 3, 20
+        TABLE_SIZE = 1 << 24
+        WORKERS = os.cpu_count() or 1
+        self.mdp1 = MDP(actions, state, execute, qfunction3, make, unmake)
+
+        self.bots = [Bot1(self.board, "NegaMax", DEPTH_N, mdp2), Bot2(self.board, "MiniMax", N * M, mdp1, TABLE_SIZE, TIME), Bot3(self.board, "Monte Carlo", TIME, MAX_MEM, DEPTH_M, UCT_CONST, mdp, WORKERS)]
+        self.eval_bot = AlphaBeta(self.board, N * M, MDP(actions, state, execute, qfunction4, make, unmake)) # own MDP: the bots set theirs from their threads
+        self.analysis = Analysis() # eval bar and hint, deepened in the background
+        self.analysis_depth = 2 # while a bot searches, the analysis stops at this depth so they do not share the CPU
+        self.search = Search() # bot moves are searched off the main loop
+        self.ponder = Ponder() # the bot that just played searches on while its opponent thinks
+        self.thinking_font = pygame.font.SysFont(MAIN_FONT, TEXT_SIZE//2)
         self.bot1 = 0
         self.bot2 = 1
         self.selected_bot = 0
@@ -108,7 +121,7 @@ class SpiderLine4:
         self.black_label = Button(self.screen, self.board.get_rect().x + self.board.get_rect().width + 10, 0, BUTTON_WIDTH//8, HEIGHT//2, BUTTON_COLOR, FONT_COLOR, "", TEXT_SIZE//2, MAIN_FONT)
         self.eval_font = pygame.font.SysFont(MAIN_FONT, int(self.black_label.width//3))
         self.eval = 0
-        self.previous_board = None
+        self.cache = PositionCache() # legal moves, eval, hint and status of the position on the board
 
         # Hint
         self.hint_lable = Button(self.screen, (WIDTH//2 - BOARD_WIDTH//2)//2 - BUTTON_WIDTH//4, HEIGHT//2 - BUTTON_HEIGHT//2, BUTTON_WIDTH//2, BUTTON_HEIGHT//2, BUTTON_COLOR, FONT_COLOR, "HINT", TEXT_SIZE//2, MAIN_FONT)
@@ -118,6 +131,9 @@ class SpiderLine4:
         self.hint_isgiven = False
 
     def initialize_board(self) -> None:
+        self.search.stop()
+        self.ponder.stop()
+        self.analysis.stop()
         self.board = Board(self.size[0], self.size[1], WIDTH//2 - BOARD_WIDTH//2, HEIGHT//2 - BOARD_HEIGHT//2, BOARD_WIDTH, BOARD_HEIGHT)
         self.game_state = 0
         self.turn = 1
@@ -135,6 +151,7 @@ class SpiderLine4:
         self.hint_isgiven = False
         self.hint_counter = 0
         self.hint = None
+        self.cache.clear()
 
     def isRunning(self) -> bool:
         '''Returns True if the current game is still running.'''
@@ -390,59 +407,38 @@ class SpiderLine4:
         if pygame.Rect(pos[0],pos[1],0,0) not in self.board.get_rect(): return (-1,-1)
         return (int((pos[1] - self.board.get_rect().y)// (SQUARE_SIZE * 8 // self.size[1])), int((pos[0] - self.board.get_rect().x) // (SQUARE_SIZE * 8 // self.size[0])))
 
-    def check_game_status(self) -> None:
-        directions = [(-1,-1),(-1,0),(0,1),(1,1),(1,0),(0,-1),(1,-1),(-1,1)]
-        for vector in directions:
-            if self.checkWin(self.board.get_matrix(),vector,self.get_turn()): self.game_state = self.get_turn()
-        if self.get_game_state() == 0 and self.checkDraw(self.board.get_matrix()): self.game_state = 3
-
-    def checkWin(self, matrix, vector: tuple[int,int], turn: int) -> bool:
-        def verify(i: int, j: int, vector: tuple[int,int], turn: int, count: int):
-            if count == 4: return True
-            elif not (-1 < i < len(matrix) and -1 < j < len(matrix[0])): return False
-            elif matrix[i][j] != str(turn): return False
-            return verify(i + vector[0], j + vector[1], vector, turn, count + 1)
-
-        for i, row in enumerate(matrix):
-            for j, entry in enumerate(row):
-                if entry == str(turn):
-                    check = verify(i, j, vector, turn, 0)
-                    if check: return check
-        return False
-
-    def checkDraw(self, matrix) -> None:
-        for row in matrix:
-            for entry in row:
-                if entry == "0": return False
-        return True
+    def check_game_status(self) -> None: self.game_state = self.cache.get(self.board, "status", self.get_status)
+    def get_status(self) -> int:
+        if self.checkWin(self.board,self.board.get_last_move(),self.get_turn()): return self.get_turn()
+        if self.checkDraw(self.board): return 3
+        return 0
+
+    def checkWin(self, board: Board, move: tuple[int,int], turn: int) -> bool: return check_win(board, move, turn)
+    def checkDraw(self, board: Board) -> bool: return check_draw(board)
 
     def get_legal_moves(self, board: Board = None) -> list[tuple[int,int]]:
-        if board is None: board = self.board
-        moves = []
-
-        for i in {0, board.get_rows() - 1}:
-            for j in range(board.get_columns()):
-                for k in range(0, board.get_rows(), 1):
-                    if i > 0: k = -k
-                    if (i+k,j) in moves: break
-                    if board.get_matrix()[i+k,j] == "0":
-                        moves.append((i+k,j))
-                        break
-
-        for j in {0, board.get_columns() - 1}:
-            for i in range(1, board.get_rows() - 1):
-                for k in range(0, board.get_columns()):
-                    if j > 0: k = -k
-                    if (i,j+k) in moves: break
-                    if board.get_matrix()[i,j+k] == "0":
-                        moves.append((i,j+k))
-                        break
-
-        return moves
+        '''The first empty cell seen from each edge entry point, kept up to date by the board's move frontier.'''
+        if board is None: return self.cache.get(self.board, "moves", partial(legal_moves, self.board))
+        return legal_moves(board)
+
+    def analyse(self) -> None:
+        '''Keeps the background analysis on the position of the board.'''
+        key = self.cache.get_key(self.board)
+        if self.analysis.get_key() != key: self.analysis.start(self.eval_bot, f"{self.get_turn() % 2 + 1}", self.board, key)
+        elif self.search.is_running() and self.analysis.is_running() and self.analysis.get_depth() >= self.analysis_depth: self.analysis.stop()
 
     def play_bot(self, bot, turn: str) -> None:
-        bot.play(turn)
+        '''Starts the search of bot in the background, then plays its move on the frame the search is done.'''
+        if not self.search.is_running():
+            self.ponder.release(bot)
+            self.search.start(bot, turn, self.board)
+            return
+        if not self.search.is_done(): return
+        piece, move = self.search.finish()
+        if move is None: return
+        self.board.place_piece(piece, move)
         self.check_game_status()
+        if self.get_game_state() == 0 and bot is not self.get_players()[1 if turn == "1" else 0]: self.ponder.start(bot, turn, self.board)
         turn = 1 if turn == "2" else 2
         self.set_turn(turn)
 
@@ -462,22 +458,20 @@ class SpiderLine4:
     def draw_board(self) -> None:
         '''Draws a background. Loops over all the board positions and draws the colored squares on even i + j positions. If a place is on the board, then the code recognizes and draws a circle on that position.'''
         square_size = SQUARE_SIZE * 8 // self.size[0]
+        matrix = self.board.get_matrix()
         pygame.draw.rect(self.screen, BOARD_COLOR, self.board.get_rect())
         for i in range(self.board.get_rows()):
             for j in range(self.board.get_columns()):
                 x, y = (self.board.get_rect().x + j * square_size, self.board.get_rect().y + i * square_size)
                 if (i+j) % 2 == 0: pygame.draw.rect(self.screen, SQUARE_COLOR, pygame.Rect(x, y, square_size, square_size))
-                if self.board.get_matrix()[i,j] != "0": pygame.draw.circle(self.screen, PLAYER_COLORS[self.board.get_matrix()[i,j]], (x + square_size//2, y + square_size//2), square_size//2)
+                if matrix[i,j] != "0": pygame.draw.circle(self.screen, PLAYER_COLORS[matrix[i,j]], (x + square_size//2, y + square_size//2), square_size//2)
 
         if self.hint_istaken and self.hint_counter < 200:
-            if not self.hint_isgiven:
-                self.eval_bot.root_state = self.board
-                root = self.eval_bot.minimax(f"{self.get_turn() % 2 + 1}", None, False)
-                prodigies = [child for child in root.get_children() if root.get_reward() == child.get_reward()]
-                self.hint = choice(prodigies).get_action()[1]
+            if not self.hint_isgiven and self.analysis.get_depth() >= self.analysis_depth:
+                self.hint = self.analysis.get_hint()
                 self.hint_isgiven = True
 
-            if self.hint != None and self.board.get_matrix()[self.hint[0],self.hint[1]] == "0":
+            if self.hint != None and matrix[self.hint[0],self.hint[1]] == "0":
                 x, y = (self.board.get_rect().x + self.hint[1] * square_size, self.board.get_rect().y + self.hint[0] * square_size)
                 pygame.draw.circle(self.screen, COLORS["green"], (x + square_size//2, y + square_size//2), square_size//4)
                 self.hint_counter += 1
@@ -505,21 +499,15 @@ class SpiderLine4:
         elif self.timer == self.ticks: self.win_label_clock += 1
 
     def draw_hlabels(self) -> None:
-        if self.board != self.previous_board or self.previous_board == None:
-            self.eval_bot.root_state = self.board
-            root = self.eval_bot.minimax(f"{self.get_turn() % 2 + 1}", None, False)
-            self.eval = max([child.get_reward() for child in root.get_children()])
-            self.eval = -self.eval if self.get_turn() == 2 else self.eval
-            eval_soft = round(softmax(self.eval), 1)
+        if self.analysis.get_value() is not None: self.eval = -self.analysis.get_value() if self.get_turn() == 2 else self.analysis.get_value()
+        eval_soft = round(softmax(self.eval), 1)
 
-            white_height = HEIGHT * eval_soft
-            black_height = HEIGHT - white_height
+        white_height = HEIGHT * eval_soft
+        black_height = HEIGHT - white_height
 
-            self.black_label.height = black_height
-            self.white_label.y = black_height
-            self.white_label.height = white_height
-
-            self.previous_board = deepcopy(self.board)
+        self.black_label.height = black_height
+        self.white_label.y = black_height
+        self.white_label.height = white_height
 
         self.black_label.draw_label("2")
         self.white_label.draw_label("1")
@@ -575,6 +563,7 @@ class SpiderLine4:
 
     def draw_game(self) -> None:
         self.cleanScreen()
+        self.analyse()
         self.draw_board()
         self.draw_hlabels()
         if self.get_display(): self.display_legal_moves()
@@ -583,6 +572,11 @@ class SpiderLine4:
         if self.get_current_state() == 4: self.draw_clocks()
         self.exit_button.draw()
         if not self.hint_istaken and self.get_current_state() == 6: self.hint_lable.draw()
+        if self.search.is_running(): self.draw_thinking()
+
+    def draw_thinking(self) -> None:
+        label = self.thinking_font.render(f"{self.search.get_bot().get_name()} THINKING...", True, FONT_COLOR)
+        self.screen.blit(label, ((WIDTH//2 - BOARD_WIDTH//2)//2 - label.get_width()//2, HEIGHT//8 + BUTTON_HEIGHT))
 
     def draw(self) -> None:
         match self.states[self.get_current_state()]:
@@ -604,5 +598,11 @@ class SpiderLine4:
                 self.play()
                 self.draw()
                 pygame.display.update()
+                self.fps_clock.tick(FPS)
                 self.timer = 0
             self.timer += 1
+        self.search.stop()
+        self.ponder.stop()
+        self.analysis.stop()
+        for bot in self.bots:
+            if isinstance(bot, Bot3): bot.close()
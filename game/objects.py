@@ -1,154 +1,117 @@
-from pygame import Rect, draw, font, transform
-from copy import deepcopy
-from game.settings import BUTTON_IMAGE, SOUND_IMAGE, SOUND_OFF_IMAGE, COLORS
+from copy import copy
+from game.bitboard import BitBoard, MoveFrontier, PIECES
 import numpy as np
-import time, threading
 
 class Board:
-    def __init__(self, n, m, x, y, width, height) -> None:
+    def __init__(self, n, m, x = 0, y = 0, width = 0, height = 0) -> None:
         self.n, self.m = n, m
         self.set_board()
-        self.rect = Rect(x,y,width,height)
+        self.rect = (x,y,width,height)
 
     def set_board(self) -> None:
-        self.matrix = np.empty((self.n,self.m), dtype = str)
-        self.matrix.fill("0")
-    def get_rows(self) -> int: return self.matrix.shape[0]
-    def get_columns(self) -> int: return self.matrix.shape[1]
-    def get_matrix(self): return deepcopy(self.matrix)
-    def get_rect(self): return self.rect
+        self.bits = BitBoard(self.n, self.m)
+        self.frontier = MoveFrontier(self.bits)
+        self.view = None
+        self.last_move = None
+        self.accumulator = None
+
+    @property
+    def matrix(self):
+        '''NumPy string view of the bitboard ("0" empty, "1"/"2" pieces), rebuilt only after the position changes.'''
+        if self.view is None:
+            self.view = np.empty((self.n,self.m), dtype = str)
+            self.view.fill("0")
+            for piece in PIECES:
+                for i, j in self.bits.pieces(piece): self.view[i,j] = piece
+        return self.view
+
+    def get_rows(self) -> int: return self.n
+    def get_columns(self) -> int: return self.m
+    def get_matrix(self): return self.matrix.copy()
+    def get_grid(self) -> list[str]: return self.bits.grid()
+    def get_last_move(self) -> tuple[int, int] | None: return self.last_move
+    def get_empty_count(self) -> int: return self.bits.get_empty_count()
+    def get_hash(self) -> int: return self.bits.get_hash()
+    def get_key(self, side: str) -> int: return self.bits.get_key(side)
+    def get_canonical(self, side: str) -> tuple[int, int]: return self.bits.get_canonical(side)
+    def get_transform(self) -> int: return self.bits.get_transform()
+    def symmetries(self) -> list[int]: return self.bits.symmetries()
+    def transform_move(self, transform: int, move: tuple[int, int]) -> tuple[int, int]: return self.bits.transform(transform, move[0], move[1])
+    def inverse_move(self, transform: int, move: tuple[int, int]) -> tuple[int, int]: return self.bits.transform(self.bits.tables.inverses[transform], move[0], move[1])
+    def get_rect(self):
+        '''Area of the board on the screen as a pygame Rect; pygame is only imported once the UI asks for it.'''
+        from pygame import Rect
+        return Rect(*self.rect)
 
     def __eq__(self, other) -> bool:
-        if other == None: return False
-        for i in range(self.n):
-            for j in range(self.m):
-                if self.matrix[i,j] != other.matrix[i,j]: return False
-        return True
-
-    def update(self, matrix) -> None: self.matrix = matrix
-    def place_piece(self, piece_type: str, move: tuple[int, int]) -> None: self.matrix[move[0],move[1]] = piece_type
-    def set_rect(self, x: int, y: int, width: int, height: int) -> None: Rect(x,y,width,height)
+        if other is None: return False
+        return self.bits == other.bits
+    def __getstate__(self):
+        '''The string view and the evaluation accumulator are caches, rebuilt on demand after unpickling.'''
+        state = self.__dict__.copy()
+        state["view"] = state["accumulator"] = None
+        return state
+
+    def copy(self):
+        board = copy(self)
+        board.bits = self.bits.copy()
+        board.frontier = self.frontier.copy()
+        if self.accumulator is not None: board.accumulator = self.accumulator.copy()
+        return board
+
+    def get_legal_moves(self) -> list[tuple[int, int]]: return self.frontier.get_moves()
+    def is_legal(self, move: tuple[int, int]) -> bool: return self.frontier.is_legal(move[0], move[1])
+    def is_empty(self, i: int, j: int) -> bool: return self.bits.is_empty(i, j)
+    def is_full(self) -> bool: return self.bits.is_full()
+    def has_line(self, piece_type: str, vector: tuple[int, int]) -> bool: return self.bits.has_line(piece_type, vector)
+    def wins_at(self, piece_type: str, move: tuple[int, int]) -> bool: return self.bits.wins_at(piece_type, move[0], move[1])
+    def completes(self, piece_type: str, move: tuple[int, int]) -> bool: return self.bits.completes(piece_type, move[0], move[1])
+
+    def update(self, matrix) -> None:
+        self.bits = BitBoard.from_matrix(matrix)
+        self.frontier = MoveFrontier(self.bits)
+        self.view = None
+        self.last_move = None
+        self.accumulator = None
+    def place_piece(self, piece_type: str, move: tuple[int, int]) -> None:
+        self.bits.place(piece_type, move[0], move[1])
+        self.frontier.update(move[0], move[1], self.bits.get_empty())
+        if self.accumulator is not None: self.accumulator.place(piece_type, move[0], move[1])
+        self.view = None
+        self.last_move = move
+    def remove_piece(self, move: tuple[int, int]) -> None:
+        self.bits.remove(move[0], move[1])
+        self.frontier.update(move[0], move[1], self.bits.get_empty())
+        if self.accumulator is not None: self.accumulator.remove(move[0], move[1], self.bits)
+        self.view = None
+        self.last_move = None
+    def set_rect(self, x: int, y: int, width: int, height: int) -> None: self.rect = (x,y,width,height)
 
     @staticmethod
-    def place(board, piece_type: str, move: tuple[int, int]) -> None:
-        board.matrix[move[0],move[1]] = piece_type
-
-class Button:
-    def __init__(self, screen, x: int, y: int, width: int, height: int, color: tuple[int,int,int], font_color: tuple[int,int,int], text: str, text_size: int, _font: str) -> None:
-        self.screen = screen
-        self.x, self.y = x, y
-        self.width, self.height = width, height
-        self.color, self.font_color = color, font_color
-        self.text, self.text_size = text, text_size
-        self.font = font.SysFont(_font, self.text_size)
-        self.rect = Rect(x,y,width,height)
-
-    def getSurface(self):
-        text = self.text() if type(self.text) != str else self.text
-        return self.font.render(text, True, self.font_color)
-    def getRect(self): return Rect(self.x, self.y, self.width, self.height)
-
-    def isClicked(self, mouse) -> bool: return 0 <= mouse[0] - self.x <= self.width and 0 <= mouse[1] - self.y <= self.height
-
-    def draw(self) -> None:
-        # draw.rect(self.screen, self.color, self.getRect())
-        self.screen.blit(transform.scale(BUTTON_IMAGE, (self.getRect().width, self.getRect().height)), (self.getRect().x, self.getRect().y))
-        self.screen.blit(self.getSurface(), (self.x + self.width//2 - self.getSurface().get_width()//2, self.y + self.height//2 - self.getSurface().get_height()//2))
-
-    def draw_sound(self)->None:
-        self.screen.blit(transform.scale(SOUND_IMAGE, (self.getRect().width, self.getRect().height)), (self.getRect().x, self.getRect().y))
-        self.screen.blit(self.getSurface(), (self.x + self.width//2 - self.getSurface().get_width()//2, self.y + self.height//2 - self.getSurface().get_height()//2))
-
-    def draw_no_sound(self)->None:
-        self.screen.blit(transform.scale(SOUND_OFF_IMAGE, (self.getRect().width, self.getRect().height)), (self.getRect().x, self.getRect().y))
-        self.screen.blit(self.getSurface(), (self.x + self.width//2 - self.getSurface().get_width()//2, self.y + self.height//2 - self.getSurface().get_height()//2))
-
-    def draw_label(self, turn: str)->None:
-        if turn == "1": draw.rect(self.screen, COLORS["white"] , self.getRect())
-        else: draw.rect(self.screen, COLORS["black"] , self.getRect())
-        self.screen.blit(self.getSurface(), (self.x + self.width//2 - self.getSurface().get_width()//2, self.y + self.height//2 - self.getSurface().get_height()//2))
-
-class Clock(): 
-    def __init__(self, screen, x: int, y: int, width: int, height: int, color: tuple[int,int,int], font_color: tuple[int,int,int], time: int, text_size: int, _font: str) ->None:
-
-        # display variables
-        self.screen = screen
-        self.x, self.y = x, y
-        self.width, self.height = width, height
-        self.color, self.font_color = color, font_color
-        self.text, self.text_size = "", text_size
-        self.font = font.SysFont(_font, self.text_size)
-        self.rect = Rect(x,y,width,height)
-
-        # timer variables
-        self.paused = True  
-        self.running = False
-        self.time = time
-        self.end = False
-
-        self.built = False
-
-    def get_time(self) -> int: return self.time
-    def set_time(self, time: int) -> None: self.time = time
-
-    def is_running(self) -> bool: return self.running
-    def run_switch(self, state: bool = None) -> None:
-        if state is not None: self.running = state
-        else: self.running = not self.running
-    def is_paused(self) -> bool: return self.paused
-    def pause_switch(self, state: bool = None) -> None:
-        if state is not None: self.paused = state
-        else: self.paused = not self.paused
-
-    def is_built(self) -> bool: return self.built
-    def set_built(self, state: bool) -> None: self.built = state
-    def get_destroyed(self) -> bool: return self.destroy
-    def set_destroyed(self, state: bool) -> None: self.destroy = state
-
-    def build_clock(self) -> None:
-        self.set_destroyed(False)
-        self.timer_thread = threading.Thread(target = self.tick)
-        self.timer_thread.daemon = True
-        self.set_built(True)
-
-    def kill(self) -> None:
-        if self.is_built():
-            self.set_destroyed(True)
-            self.run_switch(False)
-            self.pause_switch(False)
-            self.end = False
-
-    def pause(self):
-        while self.is_paused(): time.sleep(1)
-
-    def start(self) -> None:
-        self.build_clock()
-        self.timer_thread.start()
-
-    def tick(self)->None:
-        self.pause_switch(False)
-        self.run_switch(True)
-
-        for timer in range(self.time, -1, -1):
-            if self.get_destroyed():
-                self.set_built(False)
-                break
-            if self.is_paused(): self.pause()
-            seconds = timer % 60
-            minutes = timer // 60  
-            self.text = f"{minutes:02}:{seconds:02}"
-            time.sleep(1)
-            if timer == 0: 
-                self.end = True
-                break
-
-    def getSurface(self): return self.font.render(self.text, True, self.font_color)
-    def getRect(self): return Rect(self.x, self.y, self.width, self.height)
-
-    def draw(self) -> None:
-        # draw.rect(self.screen, self.color, self.getRect())
-        self.screen.blit(transform.scale(BUTTON_IMAGE, (self.getRect().width, self.getRect().height)), (self.getRect().x, self.getRect().y))
-        self.screen.blit(self.getSurface(), (self.x + self.width//2 - self.getSurface().get_width()//2, self.y + self.height//2 - self.getSurface().get_height()//2))
+    def place(board, piece_type: str, move: tuple[int, int]) -> None: board.place_piece(piece_type, move)
+
+class PositionCache:
+    """
+    Values the UI derives from the position on the board (legal moves, game status), computed once per position.
+
+    Entries are keyed by the board size and its Zobrist hash, so placing a piece, undoing it or resetting the board moves to
+    another key: when the key changes, the entries of the previous position are dropped and the next get() recomputes.
+    """
+    def __init__(self) -> None: self.key, self.values, self.hits, self.misses = None, dict(), 0, 0
+
+    def get_key(self, board) -> tuple[int, int, int]: return board.get_rows(), board.get_columns(), board.get_hash()
+
+    def get(self, board, name: str, compute):
+        '''The value called name of the position of board, compute() being called only the first time it is asked for.'''
+        key = self.get_key(board)
+        if key != self.key: self.key, self.values = key, dict()
+        if name in self.values: self.hits += 1
+        else:
+            self.values[name] = compute()
+            self.misses += 1
+        return self.values[name]
+
+    def clear(self) -> None: self.key, self.values = None, dict()
 
 class Node:
     next_node_id = 0
@@ -165,6 +128,7 @@ class Node:
         self.action = action
 
         self.terminal = False
+        self.outcome = None
         self.visits = 0
 
         self.id = Node.next_node_id
@@ -178,6 +142,9 @@ class Node:
     def get_id(self) -> int: return self.id
     def get_visits(self) -> int: return self.visits
     def get_reward(self) -> float: return self.reward
+    def get_outcome(self) -> int | None:
+        '''Cached game_state of the node: None if not analysed yet, 0 ongoing, 1 won by the last move, 2 draw.'''
+        return self.outcome
 
     def get_parent(self): return self.parent
     def get_children(self) -> set: return self.children
@@ -199,3 +166,9 @@ class Node:
     def set_action(self, action) -> None: self.action = action
     def set_children(self, children: set) -> None: self.children = children
     def set_terminal(self, terminal: bool) -> None: self.terminal = terminal
+    def set_outcome(self, outcome: int) -> None: self.outcome = outcome
+
+    def reuse(self, action) -> None:
+        '''Turns the node into a fresh node reached by action, so a search can recycle it instead of allocating a new one.'''
+        self.action, self.reward, self.visits = action, .0, 0
+        self.terminal, self.outcome = False, None
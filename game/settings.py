@@ -1,11 +1,7 @@
-from screeninfo import get_monitors
-import pygame
+# Importing this module is free of pygame and display: the sizes that depend on the monitor, the images and the window
+# are only built by init(), which the UI calls when it starts.
 
-pygame.init()
-
-monitor = get_monitors()[0]
 RESIZE_FACTOR = 0.75
-WIDTH, HEIGHT = RESIZE_FACTOR * monitor.width, RESIZE_FACTOR * monitor.height
 TITLE = "SpiderLine4"
 
 COLORS = {
@@ -34,30 +30,44 @@ COLORS = {
 }
 
 BACKGROUND = COLORS["gray"]
-
-BUTTON_WIDTH, BUTTON_HEIGHT = WIDTH//4, HEIGHT//5
 BUTTON_COLOR = COLORS["dark_wood"]
-
 FONT_COLOR = COLORS["beige"]
-TEXT_SIZE = int(BUTTON_WIDTH/10)
 MAIN_FONT = "comic sans"
 
 N, M = 8, 8
-SQUARE_SIZE = HEIGHT/M
 SQUARE_COLOR = COLORS["light_wood"]
-
-BOARD_WIDTH, BOARD_HEIGHT = SQUARE_SIZE * M, SQUARE_SIZE * N
 BOARD_COLOR = COLORS["dark_wood"]
 
 PLAYER_COLORS = {"1": COLORS["white"],"2": COLORS["black"]}
 
 FPS = 100
 
-BG_IMAGE = pygame.transform.scale(pygame.image.load("resources/assets/PNG/UI board Large  parchment.png"), (WIDTH * 1.25, HEIGHT * 1.25))
-BUTTON_IMAGE = pygame.image.load("resources/assets/PNG/TextBTN_Medium.png")
-CLOCK_IMAGE = pygame.image.load("resources/assets/PNG/UI board Small  stone.png")
-SOUND_IMAGE = pygame.image.load("resources/assets/PNG/button_sound_on.png")
-SOUND_OFF_IMAGE = pygame.image.load("resources/assets/PNG/button_sound_off.png")
+screen = None
+
+def init() -> None:
+    '''Starts pygame, sizes the window after the first monitor, loads the images and opens the window. Runs once.'''
+    global WIDTH, HEIGHT, BUTTON_WIDTH, BUTTON_HEIGHT, TEXT_SIZE, SQUARE_SIZE, BOARD_WIDTH, BOARD_HEIGHT
+    global BG_IMAGE, BUTTON_IMAGE, CLOCK_IMAGE, SOUND_IMAGE, SOUND_OFF_IMAGE, screen
+    if screen is not None: return
+    from screeninfo import get_monitors
+    import pygame
+
+    pygame.init()
+
+    monitor = get_monitors()[0]
+    WIDTH, HEIGHT = RESIZE_FACTOR * monitor.width, RESIZE_FACTOR * monitor.height
+
+    BUTTON_WIDTH, BUTTON_HEIGHT = WIDTH//4, HEIGHT//5
+    TEXT_SIZE = int(BUTTON_WIDTH/10)
+
+    SQUARE_SIZE = HEIGHT/M
+    BOARD_WIDTH, BOARD_HEIGHT = SQUARE_SIZE * M, SQUARE_SIZE * N
+
+    BG_IMAGE = pygame.transform.scale(pygame.image.load("resources/assets/PNG/UI board Large  parchment.png"), (WIDTH * 1.25, HEIGHT * 1.25))
+    BUTTON_IMAGE = pygame.image.load("resources/assets/PNG/TextBTN_Medium.png")
+    CLOCK_IMAGE = pygame.image.load("resources/assets/PNG/UI board Small  stone.png")
+    SOUND_IMAGE = pygame.image.load("resources/assets/PNG/button_sound_on.png")
+    SOUND_OFF_IMAGE = pygame.image.load("resources/assets/PNG/button_sound_off.png")
 
-screen = pygame.display.set_mode((WIDTH,HEIGHT))
-pygame.display.set_caption(TITLE)
+    screen = pygame.display.set_mode((WIDTH,HEIGHT))
+    pygame.display.set_caption(TITLE)
@@ -1,6 +1,5 @@
-from game.game import SpiderLine4
-
 def main():
+    from game.game import SpiderLine4 # imported here, so worker processes that import this module do not start the UI
     spider_line4 = SpiderLine4()
     spider_line4.run()
     quit()
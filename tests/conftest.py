@@ -0,0 +1,4 @@
+import os, sys
+
+# the tests import the engine from the repository root, wherever pytest is started from
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
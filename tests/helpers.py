@@ -0,0 +1,21 @@
+from algs.mdp import MDP
+from algs.mdpfunctions import state_analysis, get_actions, execute, make, unmake, check_win, check_draw, legal_moves
+from game.objects import Board
+from functools import partial
+import random
+
+STATE = partial(state_analysis, checkWin = check_win, checkDraw = check_draw)
+ACTIONS = partial(get_actions, get_legal_moves = legal_moves)
+
+def get_mdp(heuristic, rollout = None) -> MDP: return MDP(ACTIONS, STATE, execute, heuristic, make, unmake, rollout)
+
+def random_position(size: int, pieces: int, rng: random.Random) -> tuple[Board, str]:
+    '''(board, piece to move) after pieces random moves from the empty board that did not end the game.'''
+    while True:
+        board, piece = Board(size, size), "1"
+        for _ in range(pieces):
+            move = rng.choice(board.get_legal_moves())
+            board.place_piece(piece, move)
+            if board.wins_at(piece, move) or board.is_full(): break
+            piece = "2" if piece == "1" else "1"
+        else: return board, piece
@@ -0,0 +1,76 @@
+from algs.arena import TreeArena, NONE, EXPANDED, FREE
+import random
+
+def check(arena: TreeArena, root: int) -> set[int]:
+    '''Checks the links of the tree of root and the free list; returns the nodes of the tree.'''
+    nodes, stack = set(), [root]
+    assert arena.parents[root] == NONE
+    while stack:
+        node = stack.pop()
+        nodes.add(node)
+        children = list(arena.children(node))
+        assert arena.states[node] != FREE and (arena.states[node] == EXPANDED) == bool(children)
+        for child in children: assert arena.parents[child] == node
+        stack.extend(children)
+    free, node = 0, arena.free
+    while node != NONE:
+        assert arena.states[node] == FREE and node not in nodes
+        free, node = free + 1, arena.siblings[node]
+    assert len(nodes) == arena.get_used() and free + arena.slots - arena.top == arena.available
+    return nodes
+
+def grow(arena: TreeArena, root: int, rng: random.Random, steps: int) -> None:
+    '''Expands random leaves with 2 to 6 children and visits them, as MCTS would, until steps expansions were tried.'''
+    for _ in range(steps):
+        node = root
+        while arena.states[node] == EXPANDED: node = rng.choice(list(arena.children(node)))
+        moves = [(rng.randrange(1, 3), move) for move in rng.sample(range(64), rng.randrange(2, 7))]
+        arena.expand(node, moves)
+        while node != NONE:
+            arena.visits[node] += 1
+            arena.rewards[node] += rng.random()
+            node = arena.parents[node]
+
+def test_recycle_frees_the_least_visited_subtrees():
+    rng = random.Random(6)
+    for _ in range(20):
+        arena = TreeArena(200 * TreeArena.NODE_SIZE)
+        root = arena.new_root(1)
+        grow(arena, root, rng, 60)
+        check(arena, root)
+        keep = root
+        while arena.states[keep] == EXPANDED: keep = rng.choice(list(arena.children(keep)))
+        path, node = [], arena.parents[keep]
+        while node != NONE: path, node = path + [node], arena.parents[node]
+        stats = {node: (arena.visits[node], arena.rewards[node]) for node in check(arena, root)}
+        expanded = {node for node in stats if arena.states[node] == EXPANDED}
+        recycled, available = arena.recycled, arena.available
+
+        arena.recycle(20, keep)
+        nodes = check(arena, root)
+        assert arena.available >= max(20, arena.slots // 8) > available
+        assert all(arena.states[node] == EXPANDED for node in path)
+        assert all((arena.visits[node], arena.rewards[node]) == stats[node] for node in nodes)
+        assert arena.recycled - recycled == len(stats) - len(nodes) > 0
+        pruned = [arena.visits[node] for node in nodes if node in expanded and arena.states[node] != EXPANDED]
+        kept = [arena.visits[node] for node in nodes if arena.states[node] == EXPANDED and node not in path]
+        assert pruned and max(pruned) <= min(kept, default = max(pruned))
+
+def test_reroot_keeps_only_the_subtree():
+    rng = random.Random(7)
+    for _ in range(20):
+        arena = TreeArena(400 * TreeArena.NODE_SIZE)
+        root = arena.new_root(1)
+        grow(arena, root, rng, 40)
+        node = rng.choice(list(arena.children(rng.choice(list(arena.children(root))))))
+        subtree, stack = set(), [node]
+        while stack:
+            subtree.add(stack[-1])
+            stack.extend(arena.children(stack.pop()))
+        stats = {index: (arena.visits[index], arena.rewards[index], arena.moves[index], arena.states[index]) for index in subtree}
+
+        arena.reroot(node)
+        assert check(arena, node) == subtree
+        assert all((arena.visits[index], arena.rewards[index], arena.moves[index], arena.states[index]) == stats[index] for index in subtree)
+        grow(arena, node, rng, 20)
+        check(arena, node)
@@ -0,0 +1,92 @@
+from algs.evaluation import Accumulator, get_accumulator
+from algs.mdpfunctions import make, unmake
+from game.objects import Board, PositionCache
+from helpers import random_position
+from math import isclose
+import random
+
+def scan_legal_moves(grid: list[str]) -> set[tuple[int, int]]:
+    '''The legal moves as the game computed them before the frontier: from every edge cell, scan inwards to the first empty cell.'''
+    n, m, moves = len(grid), len(grid[0]), set()
+    for i in {0, n - 1}:
+        for j in range(m):
+            for k in range(n):
+                row = i + k if i == 0 else i - k
+                if grid[row][j] == "0":
+                    moves.add((row, j))
+                    break
+    for j in {0, m - 1}:
+        for i in range(1, n - 1):
+            for k in range(m):
+                column = j + k if j == 0 else j - k
+                if grid[i][column] == "0":
+                    moves.add((i, column))
+                    break
+    return moves
+
+def test_frontier_matches_the_scan():
+    rng = random.Random(2)
+    for n, m in ((5, 5), (6, 6), (7, 7), (8, 8), (5, 7), (8, 6)):
+        for _ in range(20):
+            board, piece, played = Board(n, m), "1", []
+            while not board.is_full():
+                moves = board.get_legal_moves()
+                assert len(moves) == len(set(moves)) and set(moves) == scan_legal_moves(board.get_grid()), board.get_grid()
+                move = rng.choice(moves)
+                board.place_piece(piece, move)
+                played.append(move)
+                piece = "2" if piece == "1" else "1"
+            assert board.get_legal_moves() == []
+            for move in reversed(played[-rng.randrange(1, len(played)):]):
+                board.remove_piece(move)
+                assert set(board.get_legal_moves()) == scan_legal_moves(board.get_grid()), board.get_grid()
+
+def snapshot(board: Board) -> tuple:
+    bits, frontier, accumulator = board.bits, board.frontier, board.accumulator
+    return (bits.masks[:], bits.empty, bits.hashes[:], frontier.landing[:], frontier.counts[:], frontier.legal, accumulator.cells[:],
+            accumulator.values[:], accumulator.ray_sums[:], accumulator.counts[:], accumulator.centers[:], accumulator.proximity[:],
+            accumulator.own.tolist(), accumulator.closeness.tolist())
+
+def walk(board: Board, piece: str, depth: int, rng: random.Random) -> None:
+    '''Makes and unmakes a few random moves per ply, as the depth-first searches do, checking the position after every unmake.
+    The accumulator after a make must agree with one computed from scratch on every ray of an occupied cell (rays of empty
+    cells are never read).'''
+    if depth == 0 or board.is_full(): return
+    before, opponent = snapshot(board), "2" if piece == "1" else "1"
+    for move in rng.sample(board.get_legal_moves(), min(3, len(board.get_legal_moves()))):
+        make(board, (piece, move))
+        fresh, rays = Accumulator(board.bits), len(board.accumulator.values) // (board.get_rows() * board.get_columns())
+        assert board.accumulator.cells == fresh.cells
+        assert all(board.accumulator.values[slot] == fresh.values[slot] for slot in range(len(fresh.values)) if fresh.cells[slot // rays])
+        assert all(isclose(a, b, abs_tol = 1e-9) for a, b in zip(board.accumulator.ray_sums, fresh.ray_sums))
+        walk(board, opponent, depth - 1, rng)
+        unmake(board, (piece, move))
+        assert snapshot(board) == before, board.get_grid()
+
+def test_make_unmake_restores_the_position():
+    rng = random.Random(8)
+    for size in (5, 6, 7, 8):
+        for _ in range(6):
+            board, piece = random_position(size, rng.randrange(0, size * size // 2), rng)
+            get_accumulator(board)
+            key, grid = board.get_key(piece), board.get_grid()
+            walk(board, piece, 3, rng)
+            assert board.get_key(piece) == key and board.get_grid() == grid
+
+def test_position_cache_follows_the_position():
+    '''Placing a piece, undoing it or resetting the board drops the values of the previous position.'''
+    cache, board = PositionCache(), Board(6, 6)
+    def moves(board: Board) -> list: return cache.get(board, "moves", lambda: sorted(board.get_legal_moves()))
+
+    assert moves(board) == moves(board) == sorted(board.get_legal_moves()) and (cache.hits, cache.misses) == (1, 1)
+    board.place_piece("1", (0, 0))
+    assert moves(board) == sorted(board.get_legal_moves()) and (cache.hits, cache.misses) == (1, 2)
+    assert cache.get(board, "status", lambda: "playing") == "playing" and cache.misses == 3
+    board.remove_piece((0, 0))
+    assert moves(board) == sorted(board.get_legal_moves()) and (cache.hits, cache.misses) == (1, 4)
+    assert cache.get(board, "status", lambda: "undone") == "undone"
+    assert moves(Board(5, 5)) == sorted(Board(5, 5).get_legal_moves()) and cache.misses == 6 # same hash, other size
+    board.place_piece("2", (5, 5))
+    moves(board)
+    board.set_board()
+    assert moves(board) == sorted(Board(6, 6).get_legal_moves()) and cache.misses == 8
@@ -0,0 +1,39 @@
+from algs.book import OpeningBook, get_book, write_book
+from game.objects import Board
+from book import get_positions
+import pytest
+
+def position(moves: list) -> Board:
+    board = Board(5, 5)
+    for piece, move in moves: board.place_piece(piece, move)
+    return board
+
+def test_book_round_trip(tmp_path):
+    '''Mirrored positions have entries of their own, and probe() returns each position's own move.'''
+    board = position([("1", (0, 0)), ("2", (4, 4))])
+    mirrored = position([("1", (0, 4)), ("2", (4, 0))])
+    assert board.get_canonical("2")[0] == mirrored.get_canonical("2")[0] and board.get_key("2") != mirrored.get_key("2")
+    index = board.bits.tables.index
+    path = str(tmp_path / "book5x5.bin")
+    write_book(path, 5, 5, 3, {board.get_key("2"): (index[0][1], 6), mirrored.get_key("2"): (index[1][4], 5), position([]).get_key("2"): (index[2][2], 7)})
+
+    book = OpeningBook(path, 5, 5)
+    assert len(book) == 3 and book.get_plies() == 3
+    assert book.find(board.get_key("2")) == (index[0][1], 6)
+    assert book.probe(board, "1") == (0, 1)
+    assert book.probe(mirrored, "1") == (1, 4)
+    assert book.probe(position([]), "1") is None # (2, 2) is not a legal move of the empty board
+    assert book.probe(position([("1", (0, 0))]), "2") is None
+    assert book.probe(position([("1", (0, 0)), ("2", (4, 4)), ("1", (0, 1))]), "2") is None # past the plies of the book
+    assert (book.hits, book.misses) == (2, 2)
+    book.close()
+
+    with pytest.raises(ValueError): OpeningBook(path, 6, 6)
+    assert len(OpeningBook(str(tmp_path / "none.bin"), 5, 5)) == 0
+
+@pytest.mark.parametrize("size", [5, 6, 7, 8])
+def test_shipped_books_cover_their_positions(size: int):
+    book = get_book(size, size)
+    for board, piece in get_positions(size, book.get_plies()):
+        move = book.probe(board, piece)
+        assert move is not None and board.is_legal(move), board.get_grid()
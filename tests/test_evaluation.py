@@ -0,0 +1,54 @@
+from algs.evaluation import evaluate1, evaluate2, batch_evaluate1, get_evaluator, get_accumulator
+from algs.mdpfunctions import heuristic1, heuristic2
+from helpers import random_position
+from math import isclose
+import numpy as np
+import random
+
+# The vectorized evaluations must give the values of the scalar heuristics they replace; both round to 3 decimals, so a
+# float summed in another order may only move the result by one unit of the last decimal.
+TOLERANCE = 1e-3 + 1e-9
+
+def positions(count: int = 40) -> list:
+    rng = random.Random(9)
+    return [random_position(size, rng.randrange(1, size * size // 2), rng)[0] for size in (5, 6, 7, 8) for _ in range(count)]
+
+def test_evaluate_matches_heuristics():
+    for board in positions():
+        grid = board.get_grid()
+        for piece, opponent in (("1", "2"), ("2", "1")):
+            assert isclose(evaluate1(board, piece, opponent), heuristic1(grid, piece, opponent), abs_tol = TOLERANCE), (grid, piece)
+            assert isclose(evaluate2(board, piece, opponent), heuristic2(grid, piece, opponent), abs_tol = TOLERANCE), (grid, piece)
+
+def test_evaluator_matches_accumulator():
+    for board in positions(10):
+        evaluator = get_evaluator(board.get_rows(), board.get_columns())
+        for piece, opponent in (("1", "2"), ("2", "1")):
+            expected = evaluator.score(board.bits, piece, opponent, 5, .5, 1)
+            assert isclose(get_accumulator(board).score(piece, opponent, 5, .5, 1), expected, abs_tol = 1e-9)
+
+def test_batch_evaluate_matches_heuristic1():
+    boards = positions(10)
+    for size in (5, 6, 7, 8):
+        group = [board for board in boards if board.get_rows() == size]
+        evaluator = get_evaluator(size, size)
+        cells = np.stack([evaluator.cells(board.bits) for board in group])
+        for piece, opponent in (("1", "2"), ("2", "1")):
+            for board, value in zip(group, batch_evaluate1(evaluator, cells, piece, opponent)):
+                assert isclose(value, heuristic1(board.get_grid(), piece, opponent), abs_tol = TOLERANCE)
+
+def test_accumulator_follows_place_and_remove():
+    rng = random.Random(4)
+    for size in (5, 8):
+        board, _ = random_position(size, 0, rng)
+        get_accumulator(board) # kept up to date from the empty board on
+        piece, moves = "1", []
+        for _ in range(size * 2):
+            move = rng.choice(board.get_legal_moves())
+            board.place_piece(piece, move)
+            moves.append(move)
+            if board.wins_at(piece, move): break
+            piece = "2" if piece == "1" else "1"
+        for move in reversed(moves[len(moves) // 2:]):
+            assert isclose(evaluate1(board, "1", "2"), heuristic1(board.get_grid(), "1", "2"), abs_tol = TOLERANCE)
+            board.remove_piece(move)
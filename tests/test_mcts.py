@@ -0,0 +1,49 @@
+from algs.mdpfunctions import qfunction, rollout
+from algs.arena import TreeArena, EXPANDED, NONE
+from algs.telemetry import NullSink, MemorySink
+from game.bots import Bot3
+from game.objects import Board
+from helpers import get_mdp
+from functools import partial
+
+def test_root_keeps_every_symmetric_move():
+    '''The playouts are cut and scored by an asymmetric evaluation, so symmetric root moves are not merged.'''
+    board = Board(5, 5)
+    bot = Bot3(board, "mcts", .2, 1 << 22, 20, .1, get_mdp(qfunction, partial(rollout, size = 16)), book = False)
+    bot.set_sink(NullSink())
+    bot.mdp.action_type, bot.mdp.action_type_opponent = "1", "2"
+    root = bot.mcts("2", eval = False)
+    assert board.symmetries() != [0]
+    assert sorted(child.get_action()[1] for child in root.get_children()) == sorted(board.get_legal_moves())
+
+def test_parallel_merge_with_reused_symmetric_root():
+    '''The workers keep their trees of the empty board, in which the position after "1" (0, 0) / "2" (4, 4) was expanded.
+    Their reused roots and the merged root have the same moves, one per legal move of that symmetric position.'''
+    board = Board(5, 5)
+    bot = Bot3(board, "mcts", .5, 1 << 22, 20, .1, get_mdp(qfunction, partial(rollout, size = 16)), workers = 2, book = False)
+    bot.set_sink(NullSink())
+    try:
+        assert bot.think("1", board) is not None
+        board.place_piece("1", (0, 0))
+        board.place_piece("2", (4, 4))
+        assert board.symmetries() != [0]
+        bot.root_state = board
+        bot.mdp.action_type, bot.mdp.action_type_opponent = "1", "2"
+        root = bot.parallel_mcts("2", eval = False)
+        assert len(root.get_children()) == len(board.get_legal_moves())
+        assert sum(child.get_visits() for child in root.get_children()) == root.get_visits() > 0
+    finally: bot.close()
+
+def test_full_arena_leaves_leaves_unexpanded():
+    '''An arena of 20 slots holds the root and its 16 children, and no grandchildren: the children are simulated as leaves.'''
+    board = Board(5, 5)
+    bot = Bot3(board, "mcts", .2, 20 * TreeArena.NODE_SIZE, 20, .1, get_mdp(qfunction, partial(rollout, size = 16)), book = False)
+    sink = MemorySink()
+    bot.set_sink(sink)
+    bot.mdp.action_type, bot.mdp.action_type_opponent = "1", "2"
+    root = bot.mcts("2")
+    arena = bot.get_arena()
+    assert len(root.get_children()) == 16 and sink.records[-1]["arena_full"] > 0
+    assert sum(child.get_visits() for child in root.get_children()) == root.get_visits() - 1
+    for node in range(arena.top):
+        assert (arena.states[node] == EXPANDED) == (arena.childs[node] != NONE)
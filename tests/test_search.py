@@ -0,0 +1,99 @@
+from algs.mdpfunctions import qfunction3, qfunction4
+from algs.telemetry import NullSink
+from game.bots import Bot1, Bot2
+from game.objects import Node
+from helpers import get_mdp, random_position
+from math import isclose
+import random
+
+def search_values(board, piece: str, heuristic, depth: int) -> tuple[float, float]:
+    '''Root values of Negamax and AlphaBeta searching board for piece to the same depth, both for piece.'''
+    opponent = "2" if piece == "1" else "1"
+    negamax, alphabeta = Bot1(board, "negamax", depth, get_mdp(heuristic)), Bot2(board, "alphabeta", depth, get_mdp(heuristic))
+    for bot in (negamax, alphabeta):
+        bot.set_sink(NullSink())
+        bot.root_state = board
+        bot.mdp.action_type, bot.mdp.action_type_opponent = piece, opponent
+    negamax.root_sign = -1 if opponent == "1" else 1
+    return negamax.negamax(opponent).get_reward(), alphabeta.minimax(opponent, eval = False).get_reward()
+
+def test_negamax_agrees_with_alphabeta_for_both_pieces():
+    rng = random.Random(5)
+    for heuristic in (qfunction3, qfunction4):
+        for _ in range(12):
+            board, piece = random_position(5, rng.randrange(3, 9), rng)
+            negamax, alphabeta = search_values(board, piece, heuristic, 3)
+            assert isclose(negamax, alphabeta, abs_tol = 1e-9), (board.get_grid(), piece)
+
+def plain_minimax(mdp, node, depth: int, maximizing: bool) -> float:
+    '''Minimax over mdp.execute without table, ordering or symmetry, with the terminal values of AlphaBeta.'''
+    if not mdp.non_terminal(node): return -float("inf") if maximizing else float("inf")
+    if depth == 0: return mdp.qfunction(node)
+    values = [plain_minimax(mdp, mdp.execute(node, action), depth - 1, not maximizing) for action in mdp.get_actions(node)]
+    return max(values) if maximizing else min(values)
+
+def test_alphabeta_matches_plain_minimax():
+    rng = random.Random(11)
+    bot = Bot2(None, "alphabeta", 3, get_mdp(qfunction3))
+    bot.set_sink(NullSink())
+    for _ in range(24):
+        board, piece = random_position(5, rng.randrange(1, 9), rng)
+        opponent = "2" if piece == "1" else "1"
+        bot.root_state = board
+        bot.mdp.action_type, bot.mdp.action_type_opponent = piece, opponent
+        root = bot.minimax(opponent, eval = False)
+        expected = plain_minimax(bot.mdp, Node(board, None, (opponent, None)), 3, True)
+        assert isclose(root.get_reward(), expected, abs_tol = 1e-9), (board.get_grid(), piece)
+
+def test_stored_move_gives_the_stored_value():
+    rng = random.Random(17)
+    bot = Bot2(None, "alphabeta", 2, get_mdp(qfunction3))
+    bot.set_sink(NullSink())
+    for _ in range(16):
+        board, piece = random_position(5, rng.randrange(1, 9), rng)
+        opponent = "2" if piece == "1" else "1"
+        bot.root_state = board
+        bot.mdp.action_type, bot.mdp.action_type_opponent = piece, opponent
+        bot.minimax(opponent, eval = False)
+        root = Node(board, None, (opponent, None))
+        for action in bot.mdp.get_actions(root):
+            child = bot.mdp.execute(root, action)
+            if not bot.mdp.non_terminal(child): continue
+            key = child.get_state().get_key(piece)
+            entry, index = bot.table.probe(key), bot.table.get_move(key)
+            assert entry is not None and index >= 0
+            move = board.bits.tables.coords[index]
+            reply = bot.mdp.execute(child, (opponent, move))
+            value = -float("inf") if not bot.mdp.non_terminal(reply) else bot.mdp.qfunction(reply)
+            assert value == entry[1], (board.get_grid(), action, move)
+
+class Recording(Bot2):
+    '''Bot2 that remembers the first action it orders at every position of a search, and the table moves found before it.'''
+    def search(self, root_action: str, root: Node = None) -> Node:
+        table = self.table
+        self.stored = {key: move for key, move, depth in zip(table.keys, table.moves, table.depths) if depth >= 0 and move >= 0}
+        self.previous, self.first = dict(self.root_order), dict()
+        return super().search(root_action, root)
+
+    def order_actions(self, actions: list, iteration: int, key: int) -> list:
+        ordered = super().order_actions(actions, iteration, key)
+        self.first.setdefault(key, (iteration, ordered[0][1]))
+        return ordered
+
+def test_deeper_iteration_tries_the_previous_best_move_first():
+    rng = random.Random(23)
+    for _ in range(6):
+        board, piece = random_position(6, rng.randrange(2, 8), rng)
+        opponent = "2" if piece == "1" else "1"
+        bot = Recording(board, "alphabeta", 4, get_mdp(qfunction3), book = False)
+        bot.set_sink(NullSink())
+        bot.mdp.action_type, bot.mdp.action_type_opponent = piece, opponent
+        bot.iterative_minimax(opponent, 1000, eval = False)
+        if bot.completed_depth < 2: continue
+        checked = 0
+        for key, (iteration, move) in bot.first.items():
+            if iteration == 0: assert bot.previous[move] == max(bot.previous.values())
+            elif key in bot.stored: assert move == board.bits.tables.coords[bot.stored[key]]
+            else: continue
+            checked += 1
+        assert checked > 1, board.get_grid()
@@ -0,0 +1,59 @@
+from algs.mdpfunctions import qfunction, qfunction3, rollout
+from algs.solver import Solver, WIN, DRAW, LOSS
+from algs.telemetry import NullSink
+from game.bots import Bot2, Bot3, solved_move
+from game.objects import Board
+from helpers import get_mdp, random_position
+from functools import partial
+import random
+
+def brute_force(board: Board, piece: str, opponent: str) -> int:
+    '''Game value of board for piece to move, by plain negamax over every move.'''
+    best = -2
+    for move in list(board.get_legal_moves()):
+        board.place_piece(piece, move)
+        value = WIN if board.wins_at(piece, move) else DRAW if board.is_full() else -brute_force(board, opponent, piece)
+        board.remove_piece(move)
+        best = max(best, value)
+        if best == WIN: break
+    return best
+
+def test_solver_matches_brute_force():
+    rng, solver = random.Random(1), Solver()
+    for _ in range(60):
+        board, piece = random_position(5, rng.randrange(16, 23), rng)
+        opponent = "2" if piece == "1" else "1"
+        value, move = solver.solve(board, piece)
+        assert value == brute_force(board.copy(), piece, opponent), board.get_grid()
+        board.place_piece(piece, move)
+        assert value == (WIN if board.wins_at(piece, move) else DRAW if board.is_full() else -brute_force(board, opponent, piece))
+
+def test_solver_stays_within_the_move_time():
+    '''An early 6x6 position cannot be solved in time: the solver gets half of the move, gives up, and the search gets what is
+    left of the move.'''
+    board = Board(6, 6)
+    board.place_piece("1", (0, 2))
+    alphabeta = Bot2(board, "alphabeta", 36, get_mdp(qfunction3), 1 << 20, .4, book = False)
+    mcts = Bot3(board, "mcts", .4, 1 << 22, 20, .1, get_mdp(qfunction, partial(rollout, size = 16)), book = False)
+    budgets = []
+    search, grow = alphabeta.iterative_minimax, mcts.mcts
+    alphabeta.iterative_minimax = lambda root_action, delta_time, *args: budgets.append(delta_time) or search(root_action, delta_time, *args)
+    mcts.mcts = lambda *args: budgets.append(mcts.get_delta_time()) or grow(*args)
+    for bot in (alphabeta, mcts):
+        bot.set_sink(NullSink())
+        bot.set_solve_empty(36)
+        assert bot.think("2", board) is not None
+        assert bot.solver.get_max_time() == .2 and bot.solver.aborted, bot.get_name()
+    assert len(budgets) == 2 and all(budget <= .2 for budget in budgets)
+    assert mcts.get_delta_time() == .4
+
+def test_lost_positions_are_searched():
+    '''A proven loss leaves the move to the search; a proven win or draw is played.'''
+    rng, bot, seen = random.Random(4), Bot2(None, "alphabeta", 2, get_mdp(qfunction3), 1 << 20, book = False), set()
+    bot.set_sink(NullSink())
+    for _ in range(80):
+        board, piece = random_position(5, rng.randrange(14, 20), rng)
+        value, move = bot.solver.solve(board, piece)
+        assert solved_move(bot, piece, board) == (None if value == LOSS else move)
+        seen.add(value)
+    assert seen == {WIN, DRAW, LOSS}
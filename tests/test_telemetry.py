@@ -0,0 +1,30 @@
+from algs.mdpfunctions import qfunction, qfunction3, qfunction4, rollout
+from algs.telemetry import MemorySink, Timed
+from game.bots import Bot1, Bot2, Bot3
+from game.objects import Board
+from helpers import get_mdp
+from functools import partial
+
+def get_bots(board: Board) -> list:
+    return [Bot1(board, "negamax", 3, get_mdp(qfunction4), book = False), Bot2(board, "alphabeta", 3, get_mdp(qfunction3), book = False),
+            Bot3(board, "mcts", .2, 1 << 22, 20, .1, get_mdp(qfunction, partial(rollout, size = 16)), book = False)]
+
+def test_every_search_emits_one_record():
+    board = Board(5, 5)
+    board.place_piece("1", (0, 0))
+    for bot in get_bots(board):
+        sink = MemorySink()
+        bot.set_sink(sink)
+        assert bot.think("2", board) is not None
+        assert len(sink.records) == 1 and sink.records[0]["timers"]["movegen"]["calls"] > 0, bot.get_name()
+        assert bot.record is None and not isinstance(bot.mdp.get_actions, Timed)
+
+def test_stopped_searches_close_their_telemetry():
+    '''AlphaBeta still sends the record of what it searched, MCTS and Negamax drop theirs; none leaves its MDP timed.'''
+    board = Board(5, 5)
+    for bot in get_bots(board):
+        sink = MemorySink()
+        bot.set_sink(sink)
+        bot.set_stop(True)
+        assert bot.think("2", board) is None, bot.get_name()
+        assert len(sink.records) <= 1 and bot.record is None and not isinstance(bot.mdp.get_actions, Timed), bot.get_name()
@@ -0,0 +1,49 @@
+from algs.mdpfunctions import qfunction3, qfunction4
+from algs.minimax import AlphaBeta
+from algs.telemetry import NullSink
+from game.bots import Bot2, Search, Ponder, Analysis
+from game.objects import Board
+from helpers import get_mdp, random_position
+from math import isclose
+import random
+import time
+
+def get_bot(board: Board, name: str) -> Bot2:
+    bot = Bot2(board, name, board.get_rows() * board.get_columns(), get_mdp(qfunction3), 1 << 20, .3, book = False)
+    bot.set_sink(NullSink())
+    return bot
+
+def test_ponder_survives_the_search_of_the_other_bot():
+    '''As in a bot against bot game: "1" has played and ponders while "2" searches, then stops pondering for its own search.'''
+    board = Board(6, 6)
+    board.place_piece("1", (0, 0))
+    first, second = get_bot(board, "first"), get_bot(board, "second")
+    ponder, search = Ponder(), Search()
+    ponder.start(first, "1", board)
+
+    ponder.release(second)
+    search.start(second, "2", board)
+    while not search.is_done(): time.sleep(.01)
+    piece, move = search.finish()
+    assert piece == "2" and move is not None
+    assert ponder.get_bot() is first and ponder.is_running() and not ponder.is_done()
+
+    stores = first.table.stores
+    ponder.release(first)
+    assert not ponder.is_running() and stores > 0
+    assert not first.get_stop() and not second.get_stop()
+
+def test_analysis_scores_for_the_side_to_move():
+    '''The analysis bot has an MDP of its own, so the analysis sets the pieces of its evaluation.'''
+    rng = random.Random(3)
+    for _ in range(4):
+        board, piece = random_position(6, rng.randrange(4, 10), rng)
+        opponent = "2" if piece == "1" else "1"
+        analysis = Analysis()
+        analysis.start(AlphaBeta(board, 36, get_mdp(qfunction4)), opponent, board)
+        while analysis.get_depth() < 2 and not analysis.is_done(): time.sleep(.01)
+        analysis.stop()
+
+        bot = AlphaBeta(board, analysis.get_depth(), get_mdp(qfunction4))
+        bot.mdp.action_type, bot.mdp.action_type_opponent = piece, opponent
+        assert isclose(analysis.get_value(), bot.minimax(opponent, eval = False).get_reward(), abs_tol = 1e-9), board.get_grid()
@@ -0,0 +1,26 @@
+from tournament import parse_spec, play_game, elo, run
+from math import isclose
+import pytest
+
+def test_parse_spec():
+    config = parse_spec("alphabeta:time=0.5,heuristic=2,book=1")
+    assert (config["algorithm"], config["time"], config["heuristic"], config["book"], config["depth"]) == ("alphabeta", .5, "2", 1, 0)
+    for spec in ("minimax", "mcts:speed=2", "negamax:heuristic=3", "negamax:name=x"):
+        with pytest.raises(ValueError): parse_spec(spec)
+
+def test_elo():
+    assert elo(5, 0, 5)[0] == 0 and isclose(elo(7, 2, 3)[0], -elo(3, 2, 7)[0])
+    value, low, high = elo(30, 10, 10)
+    assert low < value < high and value > 0
+
+def test_games_and_reports():
+    configs = (parse_spec("negamax:depth=1,solve=0"), parse_spec("alphabeta:depth=1,time=1,solve=0"))
+    for swapped in (False, True):
+        game = play_game((configs, 5, swapped, 3, None))
+        assert game["winner"] in (0, 1, None) and sum(game["moves"]) <= 25
+        assert game["moves"][int(swapped)] - game["moves"][1 - int(swapped)] in (0, 1) # piece "1" moves first
+
+    reports = run(["negamax:depth=1,solve=0", "alphabeta:depth=1,time=1,solve=0", "negamax:depth=2,solve=0"], 2, [5], 1)
+    assert len(reports) == 3 * 2
+    for report in reports:
+        assert report["games"] == report["wins"] + report["draws"] + report["losses"] == 2
@@ -0,0 +1,188 @@
+from algs.mdp import MDP
+from algs.mdpfunctions import state_analysis, get_actions, execute, make, unmake, rollout, qfunction, qfunction3, qfunction4
+from algs.mdpfunctions import check_win, check_draw, legal_moves
+from algs.telemetry import NullSink, JsonLinesSink
+from game.bots import Bot1, Bot2, Bot3, SOLVE_EMPTY
+from game.objects import Board
+from functools import partial
+from itertools import combinations
+from math import sqrt, log10
+from multiprocessing import Pool
+from time import perf_counter
+import argparse, json, os, random
+
+# Headless bot-vs-bot matches played across a process pool, e.g.
+#   python tournament.py "alphabeta:time=0.5" "mcts:time=0.5,uct=0.05" negamax:depth=3 --games 200 --sizes 5 6 7 8
+# Every pair of specs plays the given number of games on every board size, colors alternating from game to game.
+
+ALGORITHMS = {"negamax": Bot1, "alphabeta": Bot2, "mcts": Bot3}
+HEURISTICS = {"1": qfunction3, "2": qfunction4}
+DEFAULTS = {
+    "negamax": {"depth": 3, "heuristic": "2", "book": 0, "solve": SOLVE_EMPTY},
+    "alphabeta": {"depth": 0, "time": 1., "heuristic": "1", "table": 1 << 22, "book": 0, "solve": SOLVE_EMPTY},
+    "mcts": {"depth": 20, "time": 1., "uct": .1, "mem": 1 << 24, "rollouts": 64, "book": 0, "solve": SOLVE_EMPTY}
+}
+
+def parse_spec(spec: str) -> dict:
+    '''"algorithm:key=value,..." as a dict of the algorithm's defaults overridden by the given values.
+    Keys: depth (0 for alphabeta is the whole board), time (seconds per move), uct, heuristic (1 or 2, evaluate1 or evaluate2),
+    table and mem (bytes of the transposition table and of the MCTS tree), rollouts (playouts per MCTS simulation, 0 for one scalar playout),
+    book (1 to play the opening book, off by default so the openings of the games vary), solve (empty cells from which the
+    endgame is solved exactly, 0 never).'''
+    algorithm, _, options = spec.partition(":")
+    if algorithm not in ALGORITHMS: raise ValueError(f"unknown algorithm {algorithm!r} in {spec!r}, expected one of {', '.join(ALGORITHMS)}")
+    config = dict(DEFAULTS[algorithm], algorithm = algorithm, name = spec)
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        if key not in config or key in ("algorithm", "name"): raise ValueError(f"unknown option {key!r} in {spec!r}")
+        config[key] = value if key == "heuristic" else type(config[key])(float(value))
+    if config.get("heuristic", "1") not in HEURISTICS: raise ValueError(f"heuristic must be 1 or 2 in {spec!r}")
+    return config
+
+def build_bot(config: dict, board: Board):
+    '''A bot of config playing on board, with an MDP of its own; MCTS searches in the calling process (no nested pools).'''
+    state = partial(state_analysis, checkWin = check_win, checkDraw = check_draw)
+    actions = partial(get_actions, get_legal_moves = legal_moves)
+    match config["algorithm"]:
+        case "negamax":
+            bot = Bot1(board, config["name"], config["depth"], MDP(actions, state, execute, HEURISTICS[config["heuristic"]], make, unmake), bool(config["book"]))
+        case "alphabeta":
+            mdp = MDP(actions, state, execute, HEURISTICS[config["heuristic"]], make, unmake)
+            bot = Bot2(board, config["name"], config["depth"] or board.get_rows() * board.get_columns(), mdp, config["table"], config["time"], bool(config["book"]))
+        case "mcts":
+            mdp = MDP(actions, state, execute, qfunction, make, unmake, partial(rollout, size = config["rollouts"]) if config["rollouts"] else None)
+            bot = Bot3(board, config["name"], config["time"], config["mem"], config["depth"], config["uct"], mdp, 1, bool(config["book"]))
+    bot.set_solve_empty(config["solve"])
+    return bot
+
+BOTS = dict()
+
+def get_bot(config: dict, side: int, board: Board):
+    '''Bots are built once per worker, spec, side and board size, so their tables and trees are allocated once.'''
+    key = (config["name"], side, board.get_rows(), board.get_columns())
+    if key not in BOTS: BOTS[key] = build_bot(config, board)
+    return BOTS[key]
+
+def play_game(task: tuple) -> dict:
+    '''Plays one game of configs[0] against configs[1], first moving with piece "1" if not swapped; the searches write their
+    telemetry to the JSON lines file telemetry, if any. Returns the winning config (0, 1, or None for a draw) and the moves,
+    seconds and nodes of each config.'''
+    configs, size, swapped, seed, telemetry = task
+    random.seed(seed)
+    board = Board(size, size)
+    players = [get_bot(config, side, board) for side, config in enumerate(configs)]
+    for config, player in zip(configs, players):
+        player.set_sink(NullSink() if telemetry is None else JsonLinesSink(telemetry, {"bot": config["name"], "size": size, "seed": seed}))
+    moves, seconds, nodes = [0, 0], [0., 0.], [0, 0]
+    turn, winner = 1 if swapped else 0, None
+
+    while True:
+        piece = "1" if (turn == 1) == swapped else "2"
+        start = perf_counter()
+        move = players[turn].think(piece, board)
+        seconds[turn] += perf_counter() - start
+        moves[turn] += 1
+        nodes[turn] += players[turn].get_nodes()
+        if move is None: raise RuntimeError(f"{configs[turn]['name']} returned no move")
+        board.place_piece(piece, move)
+        if board.wins_at(piece, move):
+            winner = turn
+            break
+        if board.is_full(): break
+        turn = 1 - turn
+    return {"size": size, "winner": winner, "moves": moves, "seconds": seconds, "nodes": nodes}
+
+def to_elo(score: float) -> float:
+    if score <= 0: return -float("inf")
+    if score >= 1: return float("inf")
+    return 400 * log10(score / (1 - score))
+
+def elo(wins: int, draws: int, losses: int) -> tuple[float, float, float]:
+    '''Elo difference of the score of wins, draws and losses, and the bounds of its 95% confidence interval
+    (normal approximation of the mean score per game).'''
+    games = wins + draws + losses
+    score = (wins + draws / 2) / games
+    deviation = sqrt((wins * (1 - score)**2 + draws * (.5 - score)**2 + losses * score**2) / games / games)
+    return to_elo(score), to_elo(score - 1.96 * deviation), to_elo(score + 1.96 * deviation)
+
+class Tally:
+    """ Results of one pairing, from the point of view of its first config, and the search costs of both configs. """
+    def __init__(self) -> None:
+        self.wins, self.draws, self.losses = 0, 0, 0
+        self.moves, self.seconds, self.nodes = [0, 0], [0., 0.], [0, 0]
+
+    def add(self, game: dict) -> None:
+        if game["winner"] is None: self.draws += 1
+        elif game["winner"] == 0: self.wins += 1
+        else: self.losses += 1
+        for side in (0, 1):
+            self.moves[side] += game["moves"][side]
+            self.seconds[side] += game["seconds"][side]
+            self.nodes[side] += game["nodes"][side]
+
+    def get_games(self) -> int: return self.wins + self.draws + self.losses
+    def get_latency(self, side: int) -> float: return self.seconds[side] / max(self.moves[side], 1)
+    def get_speed(self, side: int) -> float: return self.nodes[side] / max(self.seconds[side], 1e-9)
+
+    def report(self) -> dict:
+        value, low, high = elo(self.wins, self.draws, self.losses)
+        return {
+            "games": self.get_games(), "wins": self.wins, "draws": self.draws, "losses": self.losses,
+            "elo": value, "elo_low": low, "elo_high": high,
+            "latency": [self.get_latency(side) for side in (0, 1)], "nodes_per_second": [self.get_speed(side) for side in (0, 1)]
+        }
+
+def run(specs: list[str], games: int, sizes: list[int], workers: int, seed: int = 0, progress = None, telemetry: str = None) -> list[dict]:
+    '''Plays games games per pair of specs and board size across workers processes and returns one report per pair and size,
+    followed by the pair's report over every size (size "all").'''
+    configs = [parse_spec(spec) for spec in specs]
+    pairs = list(combinations(range(len(configs)), 2))
+    tasks, keys = [], []
+    for pair in pairs:
+        for size in sizes:
+            for game in range(games):
+                tasks.append(((configs[pair[0]], configs[pair[1]]), size, game % 2 == 1, seed + len(tasks), telemetry))
+                keys.append((pair, size))
+
+    tallies = {key: Tally() for pair in pairs for key in [(pair, size) for size in sizes] + [(pair, "all")]}
+    with Pool(workers) as pool:
+        for done, ((pair, size), game) in enumerate(zip(keys, pool.imap(play_game, tasks)), 1):
+            tallies[(pair, size)].add(game)
+            tallies[(pair, "all")].add(game)
+            if progress is not None: progress(done, len(tasks))
+
+    return [dict(first = specs[pair[0]], second = specs[pair[1]], size = size, **tally.report()) for (pair, size), tally in tallies.items()]
+
+def print_reports(reports: list[dict]) -> None:
+    print(f"{'pairing':<48} {'size':>4} {'W-D-L':>13} {'Elo (95% CI)':>24} {'s/move':>15} {'nodes/s':>17}")
+    for report in reports:
+        pairing = f"{report['first']} vs {report['second']}"
+        result = f"{report['wins']}-{report['draws']}-{report['losses']}"
+        interval = f"{report['elo']:+.0f} [{report['elo_low']:+.0f}, {report['elo_high']:+.0f}]"
+        latency = " / ".join(f"{value:.3f}" for value in report["latency"])
+        speed = " / ".join(f"{value:.0f}" for value in report["nodes_per_second"])
+        print(f"{pairing:<48} {report['size']:>4} {result:>13} {interval:>24} {latency:>15} {speed:>17}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description = "Headless bot-vs-bot tournament. Specs are algorithm[:key=value,...] with algorithm in "
+                                     f"{', '.join(ALGORITHMS)} and keys depth, time, uct, heuristic, table, mem, rollouts, book, solve.")
+    parser.add_argument("specs", nargs = "+", help = "two or more bot specs, every pair plays")
+    parser.add_argument("--games", type = int, default = 100, help = "games per pair and board size (colors alternate)")
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [5, 6, 7, 8], help = "board sizes, n for an n x n board")
+    parser.add_argument("--workers", type = int, default = os.cpu_count() or 1)
+    parser.add_argument("--seed", type = int, default = 0)
+    parser.add_argument("--json", help = "also write the reports to this file")
+    parser.add_argument("--telemetry", help = "append the telemetry of every search to this JSON lines file")
+    args = parser.parse_args()
+    if len(args.specs) < 2: parser.error("at least two specs are needed")
+    try:
+        for spec in args.specs: parse_spec(spec)
+    except ValueError as error: parser.error(str(error))
+
+    def progress(done: int, total: int) -> None: print(f"\r{done}/{total} games", end = "\n" if done == total else "", flush = True)
+    reports = run(args.specs, args.games, args.sizes, args.workers, args.seed, progress, args.telemetry)
+    print_reports(reports)
+    if args.json:
+        with open(args.json, "w") as file: json.dump(reports, file, indent = 2)
+
+if __name__ == "__main__": main()